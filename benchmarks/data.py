@@ -0,0 +1,77 @@
+"""
+titles and urls shaped like r/all, used by every benchmark so results are comparable.
+most submissions don't qualify, so negatives dominate.
+"""
+# Standard Library
+import random
+from typing import List
+
+NEGATIVE_TITLES = [
+    "This has no numbers in it",
+    "My cat discovered the printer today",
+    "Top 10 moments from last night's game",
+    "This has numbers that don't look like time 123.456",
+    "Around 12 seconds something happens",
+    "TIL the Eiffel Tower grows 6 inches in summer",
+    "[OC] Population of every county in 2021",
+    "What's a movie everyone should watch at least once?",
+    "Me_irl",
+    "Found this in my grandpa's garage, any idea what it is?",
+]
+# look like timestamps but shouldn't be linked to
+NEAR_MISS_TITLES = [
+    "thing at 3:00 EST",
+    "thing at 3:00 Eastern",
+    "beaten in under 3:00",
+    "Live at 8:00pm",
+    "r/hololive (Sep 22 @ 21:00JST)",
+    "bad time 25:50:51",
+    "Episode 12:30 is out",
+    "Ratio 16:9 vs 21:9",
+]
+POSITIVE_TITLES = [
+    "Cool thing at 12:34",
+    "Starts at 01:22:35",
+    "The dude at 2:32. Same bro!",
+    "Documentary [00:12:34]",
+    "Skip to 4:20 for the good part",
+    "Wait for it... 0:45",
+]
+
+NEGATIVE_URLS = [
+    "https://i.redd.it/abc123def456.jpg",
+    "https://v.redd.it/abc123def456",
+    "https://www.reddit.com/r/AskReddit/comments/abc123/whats_a_movie/",
+    "https://imgur.com/a/AbC123",
+    "https://www.bbc.co.uk/news/world-12345678",
+    "https://twitter.com/user/status/1234567890",
+]
+YOUTUBE_URLS_WITH_TIMESTAMP = [
+    "https://youtu.be/bG4gZ8hXS0M?t=62",
+    "https://www.youtube.com/watch?v=bG4gZ8hXS0M&t=1m2s",
+    "https://m.youtube.com/watch?v=bG4gZ8hXS0M&feature=share#t=1m",
+]
+YOUTUBE_URLS = [
+    "https://youtu.be/bG4gZ8hXS0M",
+    "https://www.youtube.com/watch?v=bG4gZ8hXS0M",
+    "https://m.youtube.com/watch?v=bG4gZ8hXS0M&feature=share",
+    "https://www.youtube.com/shorts/bG4gZ8hXS0M",
+    "https://youtube.com/embed/bG4gZ8hXS0M?autoplay=1",
+]
+
+# timestamps from positive titles, for the conversion functions
+TIMESTAMPS = ["12:34", "01:22:35", "2:32", "00:12:34", "4:20", "0:45", "23:59:59"]
+
+
+def sample(
+    choices: List[List[str]], weights: List[float], k: int = 1000, seed: int = 0
+) -> List[str]:
+    """k items, picking a list by weight and then an item from that list"""
+    rng = random.Random(seed)
+    return [rng.choice(rng.choices(choices, weights)[0]) for _ in range(k)]
+
+
+# 80% negatives, 10% near misses, 10% positives
+TITLES = sample([NEGATIVE_TITLES, NEAR_MISS_TITLES, POSITIVE_TITLES], [80, 10, 10])
+# most links on r/all aren't youtube
+URLS = sample([NEGATIVE_URLS, YOUTUBE_URLS_WITH_TIMESTAMP, YOUTUBE_URLS], [85, 3, 12])
@@ -0,0 +1,29 @@
+# YouTubeTimestampRedditBot
+from benchmarks.data import TIMESTAMPS, TITLES
+from src.utils.time_parsing import (
+    convert_timestamp_to_seconds,
+    convert_timestamp_to_yt,
+    get_title_time,
+    is_valid_time,
+)
+
+
+def run_all(fn, values):
+    for value in values:
+        fn(value)
+
+
+def test_get_title_time(benchmark):
+    benchmark(run_all, get_title_time, TITLES)
+
+
+def test_convert_timestamp_to_yt(benchmark):
+    benchmark(run_all, convert_timestamp_to_yt, TIMESTAMPS)
+
+
+def test_convert_timestamp_to_seconds(benchmark):
+    benchmark(run_all, convert_timestamp_to_seconds, TIMESTAMPS)
+
+
+def test_is_valid_time(benchmark):
+    benchmark(run_all, is_valid_time, TIMESTAMPS)
@@ -0,0 +1,23 @@
+# YouTubeTimestampRedditBot
+from benchmarks.data import URLS, YOUTUBE_URLS
+from src.utils.youtube import (
+    add_timestamp_to_youtube_url,
+    is_youtube_url_without_timestamp,
+)
+
+
+def test_is_youtube_url_without_timestamp(benchmark):
+    def run():
+        for url in URLS:
+            is_youtube_url_without_timestamp(url)
+
+    benchmark(run)
+
+
+def test_add_timestamp_to_youtube_url(benchmark):
+    def run():
+        # only called for urls which passed is_youtube_url_without_timestamp
+        for url in YOUTUBE_URLS:
+            add_timestamp_to_youtube_url(url, "1m2s")
+
+    benchmark(run)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Microbenchmark get_title_time against the previous two-scan implementation.
+
+Both implementations are run over the same titles first to make sure they agree,
+then each is timed with timeit.
+
+Usage:
+
+    PYTHONPATH=$(pwd) python scripts/benchmark_time_parsing.py
+
+"""
+
+# Standard Library
+import timeit
+from typing import Any, Literal, Tuple, Union
+
+# Third party
+import regex
+
+# YouTubeTimestampRedditBot
+from src.utils.time_parsing import (
+    convert_timestamp_to_seconds,
+    convert_timestamp_to_yt,
+    excluded_prefixes,
+    excluded_suffixes,
+    get_title_time,
+    is_valid_time,
+)
+
+# mostly negatives, like r/all
+TITLES = [
+    "This has no numbers in it",
+    "My cat discovered the printer today",
+    "Top 10 moments from last night's game",
+    "This has numbers that don't look like time 123.456",
+    "Around 12 seconds something happens",
+    "r/hololive (Sep 22 @ 21:00JST)",
+    "Documentary [00:12:34]",
+    "beaten in under 3:00",
+    "thing at 3:00 EST",
+    "thing at 3:00 Eastern",
+    "At 0:00 and 3:45 everything explodes",
+    "bad time 25:50:51",
+    "Starts at 01:22:35",
+    "Cool thing at 12:34",
+    "The dude at 2:32. Same bro!",
+    "At 2:30 and 3:45 everything explodes",
+]
+
+
+def legacy_get_title_time(title: str) -> Union[Tuple[str, Any], Literal[False]]:
+    """get_title_time as it was before TimestampScanner"""
+    space_or_start = r"(?<=\s|^)"
+    hh_mm_ss = r"(((?:[0-2]?[0-9]:)?)([0-5]?[0-9]):[0-5][0-9])"
+    space_punctuation_or_end = r"(?=\s|\.\s|\,\s|$)"
+    hh_mm_ss_wrapped = f"{space_or_start}{hh_mm_ss}{space_punctuation_or_end}"
+    all_possible_timestamps = regex.findall(hh_mm_ss, title)
+    numeric_timestamp = regex.search(hh_mm_ss_wrapped, title)
+    if not numeric_timestamp:
+        return False
+    pre_timestamp = title[: numeric_timestamp.span()[0]]
+    if any(
+        [pre_timestamp.strip().lower().endswith(prefix) for prefix in excluded_prefixes]
+    ):
+        return False
+    post_timestamp = title[numeric_timestamp.span()[1] :]
+    if any(
+        [
+            post_timestamp.strip().lower().startswith(suffix)
+            for suffix in excluded_suffixes
+        ]
+    ):
+        return False
+    raw_matched_timestamp = numeric_timestamp.group()
+    if raw_matched_timestamp != all_possible_timestamps[0][0]:
+        return False
+    if not is_valid_time(raw_matched_timestamp):
+        return False
+    if convert_timestamp_to_seconds(raw_matched_timestamp) == 0:
+        return False
+    parsed_timestamp = convert_timestamp_to_yt(raw_matched_timestamp)
+    return (parsed_timestamp, raw_matched_timestamp)
+
+
+def run_all(fn):
+    for title in TITLES:
+        fn(title)
+
+
+def main(number: int = 2000):
+    for title in TITLES:
+        expected = legacy_get_title_time(title)
+        actual = get_title_time(title)
+        assert expected == actual, f"{title!r}: {expected} != {actual}"
+
+    results = {}
+    for name, fn in [
+        ("legacy", legacy_get_title_time),
+        ("get_title_time", get_title_time),
+    ]:
+        seconds = min(timeit.repeat(lambda: run_all(fn), number=number, repeat=5))
+        results[name] = seconds
+        per_title = seconds / (number * len(TITLES)) * 1e6
+        print(f"{name.ljust(16)} {per_title:.2f} µs/title")
+    print(f"speedup: {results['legacy'] / results['get_title_time']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
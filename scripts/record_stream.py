@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""
+Record new submissions from r/all to gzipped jsonl, for replay_stream.py.
+
+Only id, title, url, subreddit and created_utc are kept. Needs the same .env as the bot.
+
+Usage:
+
+    PYTHONPATH=$(pwd) python scripts/record_stream.py recordings/all.jsonl.gz 10000
+
+"""
+
+# Standard Library
+import sys
+
+# Third party
+from dotenv import load_dotenv
+
+# YouTubeTimestampRedditBot
+from src.bot import Bot
+from src.utils.replay import record_submissions
+
+
+def main(path: str, limit: int):
+    load_dotenv()
+    bot = Bot()
+    bot.login()
+    written = record_submissions(
+        bot.r.subreddit("all").stream.submissions(), path, limit
+    )
+    print(f"recorded {written} submissions to {path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
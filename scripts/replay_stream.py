@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""
+Replay a recording from record_stream.py through Bot.handle_submission offline.
+
+praw and pytube are replaced by stand-ins which sleep for the given latency (seconds),
+so the same recording can be used to compare performance changes.
+Reports submissions/s, p50/p99 latency per filter stage and, optionally, allocations.
+
+Usage:
+
+    PYTHONPATH=$(pwd) python scripts/replay_stream.py recordings/all.jsonl.gz \
+        --reddit-latency 0.05 --youtube-latency 0.2 --trace-allocations
+
+--hydrate-batch 100 fetches subreddit ban status 100 subreddits per request, like a backfill.
+
+"""
+
+# Standard Library
+import argparse
+
+# YouTubeTimestampRedditBot
+from src.bot import Bot
+from src.utils.replay import Latency, load_recording, replay
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--reddit-latency", type=float, default=0)
+    parser.add_argument("--youtube-latency", type=float, default=0)
+    parser.add_argument("--trace-allocations", action="store_true")
+    parser.add_argument("--hydrate-batch", type=int, default=0)
+    args = parser.parse_args()
+    latency = Latency(reddit=args.reddit_latency, youtube=args.youtube_latency)
+    # load up front so reading the recording isn't timed
+    submissions = list(load_recording(args.path, latency))
+    report = replay(
+        Bot(), submissions, latency, args.trace_allocations, args.hydrate_batch
+    )
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
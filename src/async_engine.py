@@ -0,0 +1,164 @@
+# Standard Library
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
+
+# Third party
+from praw.models import Submission
+
+# YouTubeTimestampRedditBot
+from src.utils.loggers import setup_and_get_logger
+
+if TYPE_CHECKING:
+    # YouTubeTimestampRedditBot
+    from src.bot import Bot
+
+logger = setup_and_get_logger(
+    "async_engine.py", os.environ.get("log_level", "INFO").upper()
+)
+
+
+class AsyncEngine:
+    """
+    run the bot as separate asyncio tasks joined by bounded queues:
+    ingestion -> evaluation -> bot.comment_outbox -> commenting (rate limited),
+    plus moderation on a timer.
+    sleeping between comments only pauses the commenting task, the stream keeps being read.
+
+    praw is synchronous and its Reddit instance isn't thread safe, so every call which can
+    use bot.r runs one at a time on a single "praw" thread (run_blocking).
+    only youtube fetches, which don't touch praw, run in the default executor (run_in_thread).
+    the stream is read with pause_after=-1 so a quiet stream never holds the praw thread,
+    waiting between polls happens in asyncio instead.
+    """
+
+    # returned by next once the stream is exhausted, since None means no new submissions yet
+    end_of_stream = object()
+
+    def __init__(
+        self,
+        bot: "Bot",
+        submission_queue_size: int = 100,
+        stream_poll_interval: float = 5,
+    ):
+        self.bot = bot
+        self.submission_queue_size = submission_queue_size
+        self.stream_poll_interval = stream_poll_interval
+        # created in run, so each run gets its own thread
+        self.praw_executor: Optional[ThreadPoolExecutor] = None
+        # created in run, python < 3.10 binds them to the loop they're created in
+        self.submission_queue: "asyncio.Queue[Submission]"
+        self.comment_ready: asyncio.Event
+        self.evaluated = 0
+        self.commented = 0
+
+    async def run_blocking(self, fn: Callable, *args) -> Any:
+        """run fn on the praw thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.praw_executor, partial(fn, *args))
+
+    async def run_in_thread(self, fn: Callable, *args) -> Any:
+        """run fn in the default executor. fn must not use praw."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(fn, *args))
+
+    def stream(self) -> Iterator[Optional[Submission]]:
+        return self.bot.submission_stream(pause_after=-1)
+
+    async def ingest(self):
+        stream = self.stream()
+        while True:
+            submission = await self.run_blocking(next, stream, self.end_of_stream)
+            if submission is self.end_of_stream:
+                return
+            if submission is None:
+                # no new submissions in the last response
+                await asyncio.sleep(self.stream_poll_interval)
+                continue
+            # wait for evaluation to catch up if the queue is full
+            await self.submission_queue.put(submission)
+
+    async def evaluate(self):
+        while True:
+            submission = await self.submission_queue.get()
+            try:
+                # fetch youtube metadata off the praw thread, evaluate then hits the cache
+                await self.run_in_thread(self.bot.prefetch_youtube_metadata, submission)
+                comment, msg = await self.run_blocking(
+                    self.bot.evaluate_submission, submission
+                )
+                self.evaluated += 1
+                self.bot.log_submission(submission, msg)
+                self.bot.checkpoint.mark(submission)
+                if comment is not None:
+                    # never block evaluation on the comment rate limit
+                    self.bot.comment_outbox.push(submission, comment)
+                    self.comment_ready.set()
+            finally:
+                self.submission_queue.task_done()
+
+    async def post_comments(self):
+        while True:
+            await self.comment_ready.wait()
+            entry = self.bot.comment_outbox.pop()
+            if entry is None:
+                self.comment_ready.clear()
+                continue
+            submission, comment = entry
+            # submission may have been commented on while it was queued
+            if await self.run_blocking(self.bot.already_commented, submission):
+                continue
+            msg = await self.run_blocking(
+                self.bot.comment_on_submission, submission, comment
+            )
+            self.commented += 1
+            logger.info(msg)
+            await asyncio.sleep(self.bot.comment_wait_time * 60)
+
+    async def moderate(self):
+        while True:
+            await asyncio.sleep(self.bot.check_bad_comment_wait_time * 60)
+            logger.info("checking for bad comments")
+            await self.run_blocking(self.bot.delete_bad_comments)
+
+    async def wait_for_first(self, tasks):
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # raise errors from whichever task stopped
+            task.result()
+
+    async def run(self):
+        """
+        run until the stream ends (it doesn't for r/all) or a task fails.
+        errors are re-raised so Bot.main can retry.
+        """
+        self.submission_queue = asyncio.Queue(self.submission_queue_size)
+        self.praw_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="praw"
+        )
+        self.comment_ready = asyncio.Event()
+        ingest = asyncio.ensure_future(self.ingest())
+        workers = [
+            asyncio.ensure_future(coro)
+            for coro in [self.evaluate(), self.post_comments(), self.moderate()]
+        ]
+        drained = None
+        try:
+            await self.wait_for_first([ingest, *workers])
+            # only ingest finishes without an error, evaluate what it already queued
+            drained = asyncio.ensure_future(self.submission_queue.join())
+            await self.wait_for_first([drained, *workers])
+        finally:
+            for task in [ingest, *workers, drained]:
+                if task:
+                    task.cancel()
+            # don't wait for a request which is still in flight, e.g. after an error
+            self.praw_executor.shutdown(wait=False)
+            outbox = self.bot.comment_outbox
+            logger.info(
+                f"evaluated {self.evaluated}, commented {self.commented}, "
+                f"comment outbox depth {len(outbox)}, "
+                f"dropped full {outbox.dropped_full}, dropped stale {outbox.dropped_stale}"
+            )
@@ -1,33 +1,75 @@
 # Standard Library
+import asyncio
 import json
 import logging
 import os
+import re
+import signal
+import sys
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Tuple
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 # Third party
 import praw
+import requests
 from dotenv import load_dotenv
 from praw.models import Comment, Submission
-from prawcore.exceptions import RequestException, ResponseException, ServerError
-from pytube import YouTube
+from prawcore.exceptions import (
+    RequestException,
+    ResponseException,
+    ServerError,
+    TooManyRequests,
+)
 from requests.exceptions import ConnectionError, ReadTimeout
 
 # YouTubeTimestampRedditBot
+from src.async_engine import AsyncEngine
 from src.data.subreddits import blacklist, min_karma_dict
-from src.utils.loggers import monkey_patch_praw_objs, setup_and_get_logger
+from src.utils.cache import TTLCache
+from src.utils.comment_outbox import CommentOutbox
+from src.utils.comment_sweeper import CommentSweeper
+from src.utils.commented_index import CommentedIndex
+from src.utils.hydration import Hydrator
+from src.utils.loggers import (
+    monkey_patch_praw_objs,
+    setup_and_get_logger,
+    snapshot_str,
+    submission_log_payload,
+)
+from src.utils.metrics import Metrics, start_metrics_server
+from src.utils.retry import RateLimitState, RetryEngine, RetryPolicy
+from src.utils.stream_checkpoint import StreamCheckpoint
 from src.utils.time_parsing import (
     TimestampParseError,
     convert_timestamp_to_seconds,
     get_title_time,
 )
 from src.utils.youtube import (
+    YouTubeMetadataCache,
+    YouTubeSession,
     add_timestamp_to_youtube_url,
+    fetch_youtube_metadata,
     is_youtube_url_without_timestamp,
 )
 
 __version__ = "2.4.7"
+bad_bot_regex = re.compile("bad bot", re.IGNORECASE)
 LOGLEVEL = os.environ.get("log_level", "INFO").upper()
 logger = setup_and_get_logger("bot.py", LOGLEVEL)
 
@@ -35,12 +77,30 @@ logger = setup_and_get_logger("bot.py", LOGLEVEL)
 class Bot:
     def __init__(
         self,
-        connection_retry_limit: int = 3,
+        connection_retry_limit: int = 0,
         connection_retry_wait_time: int = 1,
+        connection_retry_max_wait_time: int = 30,
         comment_wait_time: int = 10,
         check_bad_comment_wait_time: int = 10,
+        check_bad_comment_limit: int = 100,
+        bad_bot_detection: str = "replies",
         batch_submission_limit: int = 1000,
         git_repo: str = "",
+        karma_cache_ttl: int = 60,
+        subreddit_cache_ttl: int = 60,
+        subreddit_cache_size: int = 5000,
+        youtube_cache_size: int = 1000,
+        youtube_cache_db: str = "",
+        engine: str = "sync",
+        comment_outbox_size: int = 10,
+        comment_max_age: int = 60,
+        commented_index_path: str = "",
+        checkpoint_path: str = "",
+        backfill_limit: int = 1000,
+        batch_workers: int = 8,
+        youtube_deadline: int = 10,
+        metrics_port: int = 0,
+        metrics_log_interval: int = 0,
     ):
         self.blacklist = blacklist
         self.min_karma_dict = min_karma_dict
@@ -48,13 +108,124 @@ class Bot:
         self.version = __version__
         self.connection_retry_limit = connection_retry_limit
         self.connection_retry_wait_time = connection_retry_wait_time
+        # filled in from every response, so retries can wait for the rate limit to reset
+        self.rate_limit = RateLimitState()
+        max_wait = connection_retry_max_wait_time * 60
+        # first match wins, TooManyRequests and ServerError are ResponseExceptions
+        self.retry_engine = RetryEngine(
+            [
+                ((TooManyRequests,), RetryPolicy(60, max_wait)),
+                ((ServerError,), RetryPolicy(30, max_wait)),
+                (
+                    (RequestException, ConnectionError, ReadTimeout),
+                    RetryPolicy(connection_retry_wait_time * 60, max_wait),
+                ),
+                # e.g. 401 or 403, which are unlikely to go away quickly
+                ((ResponseException,), RetryPolicy(10 * 60, max_wait)),
+            ],
+            max_failures=connection_retry_limit,
+            rate_limit=self.rate_limit,
+        )
         self.comment_wait_time = comment_wait_time
         self.check_bad_comment_wait_time = check_bad_comment_wait_time
         self.batch_submission_limit = batch_submission_limit
+        self.batch_workers = batch_workers
         self.git_repo = git_repo
-        self.last_commented = datetime.now()
+        self.engine = engine
+        self.karma_cache_ttl = karma_cache_ttl
+        self.comment_karma: Optional[int] = None
+        self.comment_karma_fetched_at = datetime.now()
+        self.comment_karma_lock = threading.Lock()
+        # ban status per subreddit name
+        self.subreddit_cache = TTLCache(
+            max_size=subreddit_cache_size, ttl=subreddit_cache_ttl * 60
+        )
+        # one connection per batch worker, kept alive between fetches
+        self.youtube_session = YouTubeSession(
+            pool_size=batch_workers, deadline=youtube_deadline
+        )
+        self.youtube_cache = YouTubeMetadataCache(
+            max_size=youtube_cache_size,
+            db_path=youtube_cache_db,
+            fetch=partial(fetch_youtube_metadata, session=self.youtube_session),
+        )
+        # comment straight away the first time something qualifies
+        self.last_commented = datetime.min
+        # qualifying submissions wait here for comment_wait_time, instead of the bot sleeping
+        self.comment_outbox = CommentOutbox(
+            max_size=comment_outbox_size, max_age=comment_max_age * 60
+        )
+        self.commented_index = CommentedIndex(commented_index_path)
+        # where the stream got to, so retries and restarts resume from there
+        self.checkpoint = StreamCheckpoint(checkpoint_path)
+        self.backfill_limit = backfill_limit
         self.last_checked_bad_comments = datetime.now()
+        self.check_bad_comment_limit = check_bad_comment_limit
+        self.bad_bot_detection = bad_bot_detection
+        # created_utc and fullname of the newest comment reply read from the inbox
+        self.newest_reply_utc: Optional[float] = None
+        self.newest_reply_name: Optional[str] = None
+        # replies are checked every check_bad_comment_wait_time at first, then less often
+        self.comment_sweeper = CommentSweeper(
+            min_interval=check_bad_comment_wait_time * 60
+        )
         self.stream_log = ""
+        # cheapest checks first, checks which hit the network only run on survivors
+        self.filter_stages: List[
+            Tuple[str, Callable[[Submission, Dict[str, Any]], Optional[str]]]
+        ] = [
+            ("youtube_url", self.filter_youtube_url),
+            ("blacklist", self.filter_blacklist),
+            ("title_timestamp", self.filter_title_timestamp),
+            ("karma", self.filter_karma),
+            ("banned", self.filter_banned),
+            ("youtube_metadata", self.filter_youtube_metadata),
+            ("already_commented", self.filter_already_commented),
+        ]
+        # stages which only use fields already in the listing payload, no praw requests
+        self.local_filter_stages = {"youtube_url", "blacklist", "title_timestamp"}
+        self.filter_rejections: Counter = Counter()
+        # submissions may be evaluated from worker threads
+        self.filter_rejections_lock = threading.Lock()
+        self.metrics_port = metrics_port
+        self.metrics_log_interval = metrics_log_interval
+        self.metrics_logged_at = datetime.now()
+        self.metrics_server = None
+        # None unless enabled, so there's nothing to time or count otherwise
+        self.metrics: Optional[Metrics] = None
+        if metrics_port or metrics_log_interval:
+            self.metrics = Metrics()
+            self.instrument(self.metrics)
+
+    def instrument(self, metrics: Metrics):
+        """time each filter stage, youtube fetches and replies"""
+        self.filter_stages = [
+            (stage, metrics.timed("stage", check, stage=stage))
+            for (stage, check) in self.filter_stages
+        ]
+        self.youtube_cache.fetch = metrics.timed(
+            "youtube_fetch", self.youtube_cache.fetch
+        )
+        self.comment_on_submission = metrics.timed(  # type: ignore
+            "stage", self.comment_on_submission, stage="reply"
+        )
+
+        def collect():
+            metrics.gauge("comment_outbox_depth", len(self.comment_outbox))
+            for stat in ["hits", "disk_hits", "misses"]:
+                metrics.gauge(
+                    "youtube_cache", getattr(self.youtube_cache, stat), result=stat
+                )
+
+        metrics.collectors.append(collect)
+
+    def log_metrics(self):
+        if self.metrics is None or not self.metrics_log_interval:
+            return
+        delta = datetime.now() - self.metrics_logged_at
+        if delta.total_seconds() >= self.metrics_log_interval * 60:
+            logger.info(f"metrics:\n{self.metrics.summary()}")
+            self.metrics_logged_at = datetime.now()
 
     def login(self):
         login_kwargs = {
@@ -69,6 +240,17 @@ class Bot:
             login_kwargs["refresh_token"] = refresh_token
         else:
             login_kwargs["password"] = os.getenv("password")
+        session = requests.Session()
+        session.hooks["response"].append(self.rate_limit.record_response)
+        login_kwargs["requestor_kwargs"] = {"session": session}
+        if self.metrics is not None:
+            # count api calls and read rate limit headers from every response
+            session.hooks["response"].append(self.metrics.record_response)
+            if self.metrics_port and self.metrics_server is None:
+                self.metrics_server = start_metrics_server(
+                    self.metrics, self.metrics_port
+                )
+                logger.info(f"serving metrics on port {self.metrics_port}")
         self.r = praw.Reddit(**login_kwargs)
         monkey_patch_praw_objs(self.r.config.reddit_url)
 
@@ -85,86 +267,317 @@ I'm a bot, bleep bloop.{'  '}
 {self.generate_footer()}
 """
 
+    def delete_comments_with_bad_replies(self) -> bool:
+        """
+        check unread replies to the bot's comments for "bad bot", and delete the comment replied to.
+        replies are read newest first, back to the newest one seen by the last check
+        (or check_bad_comment_limit of them after a restart), so work is proportional to new
+        replies, rather than recent comments * replies or everything left unread in the inbox.
+        returns True if a comment was deleted.
+        """
+        newest_utc, newest_name = self.newest_reply_utc, self.newest_reply_name
+        replies = []
+        # only comment replies, not pms (e.g. from delete_bad_comments),
+        # post replies or username mentions
+        for (i, item) in enumerate(
+            self.r.inbox.comment_replies(
+                limit=self.check_bad_comment_limit if newest_utc is None else None
+            )
+        ):
+            if newest_utc is not None and (
+                item.name == newest_name or item.created_utc < newest_utc
+            ):
+                break
+            # newest first
+            if i == 0:
+                self.newest_reply_utc = item.created_utc
+                self.newest_reply_name = item.name
+            # replies from before a restart were marked read when they were checked
+            if item.new:
+                replies.append(item)
+        deleted: Set[str] = set()
+        for reply in replies:
+            # fullname of the bot's comment, e.g. t1_abc123
+            parent_id = reply.parent_id.split("_", 1)[1]
+            if parent_id in deleted or not bad_bot_regex.search(reply.body):
+                continue
+            reason_to_delete = "Deleting comment with 'bad bot' reply"
+            logger.info(reason_to_delete)
+            # pm bot self with comment details before deleting
+            self.r.redditor(self.username).message(
+                reason_to_delete,
+                f"* comment: {parent_id}\n* reply: {reply.body}\n* permalink: {reply.context}",
+            )
+            # lazy comment, only the id is needed to delete it
+            self.r.comment(parent_id).delete()
+            deleted.add(parent_id)
+        if replies:
+            self.r.inbox.mark_read(replies)
+        return bool(deleted)
+
     def delete_bad_comments(self):
-        for comment in self.r.user.me().comments.new(limit=25):
+        deleted = False
+        if self.bad_bot_detection == "inbox":
+            deleted = self.delete_comments_with_bad_replies()
+        seen = []
+        # one request for the whole listing, scores come with it
+        for comment in self.r.user.me().comments.new(
+            limit=self.check_bad_comment_limit
+        ):
+            seen.append(comment.id)
             reason_to_delete = self.should_delete_comment(comment)
             if reason_to_delete:
                 logger.info(reason_to_delete)
                 # pm bot self with comment details before deleting
-                self.r.redditor(self.username).message(reason_to_delete, str(comment))
+                self.r.redditor(self.username).message(
+                    reason_to_delete, snapshot_str(comment)
+                )
                 comment.delete()
+                deleted = True
+        self.comment_sweeper.forget_missing(seen)
+        # karma only changes here if a comment was removed
+        if deleted:
+            self.invalidate_comment_karma()
+
+    def get_comment_karma(self) -> int:
+        """
+        karma only changes a few times a day, so cache it for karma_cache_ttl minutes
+        instead of fetching it for every submission.
+        """
+        with self.comment_karma_lock:
+            now = datetime.now()
+            delta = now - self.comment_karma_fetched_at
+            if self.comment_karma is None or delta.total_seconds() >= (
+                self.karma_cache_ttl * 60
+            ):
+                self.comment_karma = self.r.redditor(self.username).comment_karma
+                self.comment_karma_fetched_at = now
+            return self.comment_karma
+
+    def invalidate_comment_karma(self):
+        with self.comment_karma_lock:
+            self.comment_karma = None
+
+    def get_subreddit_info(self, subreddit_name: str) -> Dict[str, Any]:
+        """
+        cached results for a subreddit which need a request to fetch (e.g. ban status),
+        filled in lazily by the filter stages.
+        """
+        return self.subreddit_cache.get_or_set(subreddit_name, dict)
+
+    def hydrate_subreddit_info(self, submissions: Iterable[Submission]):
+        """
+        fetch ban status for the subreddits of submissions which pass the local filter stages,
+        100 subreddits per request, so filter_banned doesn't need a request per subreddit.
+        the karma check only needs the bot's own karma, which is already cached.
+        """
+        hydrator = Hydrator(self.r)
+        for submission in submissions:
+            if self.run_filter_stages(submission, {}, self.local_filter_stages):
+                continue
+            subreddit_name = submission.subreddit.display_name.lower()
+            if "banned" not in self.get_subreddit_info(subreddit_name):
+                hydrator.add_subreddit(subreddit_name)
+        if not hydrator:
+            return
+        for (subreddit_name, subreddit) in hydrator.resolve().items():
+            # only from the info response, reading a missing user_is_banned would fetch it
+            banned = vars(subreddit).get("user_is_banned")
+            if banned is not None:
+                self.get_subreddit_info(subreddit_name)["banned"] = banned
 
     def should_delete_comment(self, comment: Comment) -> str:
         if comment.score < 1:
             return f"Deleting comment with low score {comment.score}"
-        if any(["bad bot" in reply.body.lower() for reply in comment.replies]):
+        # replies arrive in the inbox instead, see delete_comments_with_bad_replies
+        if self.bad_bot_detection == "inbox":
+            return ""
+        # fetching replies costs a request per comment, so only do it when the sweeper says so
+        if not self.comment_sweeper.replies_due(comment):
+            return ""
+        # comments from a listing come without replies, refresh loads them (1 request)
+        comment.refresh()
+        replies = list(comment.replies)
+        self.comment_sweeper.checked_replies(comment, len(replies))
+        if any(bad_bot_regex.search(reply.body) for reply in replies):
             return "Deleting comment with 'bad bot' reply"
         return ""
 
     def already_commented(self, submission: Submission) -> bool:
-        return any(
-            [comment.author.name == self.username for comment in submission.comments]
+        if submission.id in self.commented_index:
+            return True
+        # the bot only leaves top level comments, so don't load the rest of the comment forest
+        submission.comments.replace_more(limit=0)
+        found = any(
+            # author is None for deleted accounts
+            comment.author is not None and comment.author.name == self.username
+            for comment in submission.comments
         )
+        if found:
+            self.commented_index.add(submission.id)
+        return found
 
-    def parse_submission(self, submission: Submission) -> Tuple[bool, str]:
-        """check if submission meets bot criteria, and if it does, comment on the submission."""
-        subreddit_name = submission.subreddit.display_name.lower()
-        min_karma_requirement = self.min_karma_dict.get(subreddit_name, 0)
-        comment_karma = self.r.redditor(self.username).comment_karma
-        if subreddit_name in self.blacklist:
-            return False, "subreddit in blacklist"
-        if submission.subreddit.user_is_banned:
-            return False, "user is banned"
-        # assume bot only ever gets comment karma, since it doesn't create posts
-        if min_karma_requirement > comment_karma:
-            return (
-                False,
-                f"need {min_karma_requirement} karma to post in {subreddit_name}, only have {comment_karma}",
-            )
+    # filter stages return a reason to reject the submission, or None if it passes.
+    # candidate holds values computed by earlier stages for use in later ones.
+    def filter_youtube_url(
+        self, submission: Submission, candidate: Dict[str, Any]
+    ) -> Optional[str]:
         if not is_youtube_url_without_timestamp(submission.url):
-            return False, ""
+            return ""
+        return None
+
+    def filter_blacklist(
+        self, submission: Submission, candidate: Dict[str, Any]
+    ) -> Optional[str]:
+        if submission.subreddit.display_name.lower() in self.blacklist:
+            return "subreddit in blacklist"
+        return None
+
+    def filter_title_timestamp(
+        self, submission: Submission, candidate: Dict[str, Any]
+    ) -> Optional[str]:
         try:
             reddit_title_timestamp = get_title_time(submission.title)
         except TimestampParseError as e:
             logger.error(
                 f"Failed to parse reddit title {submission.title}. Error:\n{e}"
             )
-            return False, ""
+            return ""
         if not reddit_title_timestamp:
-            return False, "no timestamp in reddit title"
-        timestamp, raw_timestamp = reddit_title_timestamp
-        yt_metadata = YouTube(submission.url)
+            return "no timestamp in reddit title"
+        candidate["timestamp"], candidate["raw_timestamp"] = reddit_title_timestamp
+        return None
+
+    def filter_karma(
+        self, submission: Submission, candidate: Dict[str, Any]
+    ) -> Optional[str]:
+        # not cached per subreddit, karma is already cached by get_comment_karma
+        # and has to be compared again whenever it's invalidated
+        return self.check_karma(submission.subreddit.display_name.lower())
+
+    def check_karma(self, subreddit_name: str) -> Optional[str]:
+        min_karma_requirement = self.min_karma_dict.get(subreddit_name, 0)
+        # only fetch karma for subreddits which have a requirement
+        if not min_karma_requirement:
+            return None
+        comment_karma = self.get_comment_karma()
+        # assume bot only ever gets comment karma, since it doesn't create posts
+        if min_karma_requirement > comment_karma:
+            return f"need {min_karma_requirement} karma to post in {subreddit_name}, only have {comment_karma}"
+        return None
+
+    def filter_banned(
+        self, submission: Submission, candidate: Dict[str, Any]
+    ) -> Optional[str]:
+        subreddit_info = self.get_subreddit_info(
+            submission.subreddit.display_name.lower()
+        )
+        if "banned" not in subreddit_info:
+            subreddit_info["banned"] = submission.subreddit.user_is_banned
+        if subreddit_info["banned"]:
+            return "user is banned"
+        return None
+
+    def filter_youtube_metadata(
+        self, submission: Submission, candidate: Dict[str, Any]
+    ) -> Optional[str]:
+        raw_timestamp = candidate["raw_timestamp"]
+        try:
+            yt_metadata = self.youtube_cache.get(submission.url)
+        except requests.RequestException as e:
+            # e.g. youtube_deadline passed, not worth restarting the stream for
+            return f"failed to fetch youtube metadata: {e}"
         # add 3 second buffer for human error when putting video length in title
         if (title_time := convert_timestamp_to_seconds(raw_timestamp)) >= (
             yt_time := yt_metadata.length - 3
         ):
-            return False, f"timestamp {title_time} at or beyond yt bounds {yt_time}"
+            return f"timestamp {title_time} at or beyond yt bounds {yt_time}"
         if raw_timestamp in yt_metadata.title:
-            return False, "timestamp in youtube title"
+            return "timestamp in youtube title"
+        return None
+
+    def filter_already_commented(
+        self, submission: Submission, candidate: Dict[str, Any]
+    ) -> Optional[str]:
         if self.already_commented(submission):
-            return False, "already commented"
-        new_url = add_timestamp_to_youtube_url(submission.url, timestamp)
-        comment = self.generate_comment(new_url)
+            return "already commented"
+        return None
+
+    def run_filter_stages(
+        self,
+        submission: Submission,
+        candidate: Dict[str, Any],
+        stages: Optional[Collection[str]] = None,
+    ) -> Optional[Tuple[str, str]]:
+        """
+        run the filter stages named in stages (default all of them) in order, filling in candidate.
+        returns (stage, reason) for the first stage which rejects the submission, or None.
+        """
+        for (stage, check) in self.filter_stages:
+            if stages is not None and stage not in stages:
+                continue
+            reason = check(submission, candidate)
+            if reason is not None:
+                return stage, reason
+        return None
+
+    def count_rejection(self, stage: str):
+        with self.filter_rejections_lock:
+            self.filter_rejections[stage] += 1
+        if self.metrics is not None:
+            self.metrics.count("filter_rejections", stage=stage)
+
+    def evaluate_submission(self, submission: Submission) -> Tuple[Optional[str], str]:
+        """
+        check if submission meets bot criteria.
+        returns the comment to post (or None if the submission doesn't qualify) and a message.
+        """
+        candidate: Dict[str, Any] = {}
+        rejection = self.run_filter_stages(submission, candidate)
+        if rejection is not None:
+            stage, reason = rejection
+            self.count_rejection(stage)
+            return None, reason
+        new_url = add_timestamp_to_youtube_url(submission.url, candidate["timestamp"])
+        return self.generate_comment(new_url), ""
+
+    def comment_on_submission(self, submission: Submission, comment: str) -> str:
         submission.reply(comment)
-        return True, f"!!got one!! comment: {comment}"
+        self.commented_index.add(submission.id)
+        self.invalidate_comment_karma()
+        if self.metrics is not None:
+            self.metrics.count("comments")
+        return f"!!got one!! comment: {comment}"
 
-    def handle_comment_sleep(self):
+    def parse_submission(self, submission: Submission) -> Tuple[bool, str]:
+        """check if submission meets bot criteria, and if it does, comment on the submission."""
+        comment, msg = self.evaluate_submission(submission)
+        if comment is None:
+            return False, msg
+        return True, self.comment_on_submission(submission, comment)
+
+    def is_comment_due(self) -> bool:
+        delta = datetime.now() - self.last_commented
+        return delta.total_seconds() >= self.comment_wait_time * 60
+
+    def handle_comment_outbox(self):
         """
-        determine how long bot should sleep for after commenting.
+        comment on the best queued submission, if comment_wait_time has passed since the last comment.
         e.g. comment_wait_time = 10 (minutes)
         last_commented 1 minute ago
-        sleep for 9 minutes before commenting again
+        keep evaluating new submissions for 9 more minutes, then comment on the best one
         """
-        now = datetime.now()
-        delta = now - self.last_commented
-        self.last_commented = now
-        max_seconds_to_sleep = self.comment_wait_time * 60
-        if delta.seconds < max_seconds_to_sleep:
-            min_seconds_to_sleep = max_seconds_to_sleep - delta.seconds
-            logger.info(
-                f"comment successful! sleeping for {min_seconds_to_sleep} second(s)"
-            )
-            time.sleep(min_seconds_to_sleep)
+        if not self.comment_outbox or not self.is_comment_due():
+            return
+        entry = self.comment_outbox.pop()
+        if entry is None:
+            return
+        submission, comment = entry
+        # submission may have been commented on while it was queued
+        if self.already_commented(submission):
+            return
+        logger.info(self.comment_on_submission(submission, comment))
+        self.last_commented = datetime.now()
 
     def handle_delete_bad_comments(self):
         """
@@ -184,74 +597,219 @@ I'm a bot, bleep bloop.{'  '}
         self.stream_log += v
         if len(self.stream_log) > 50:
             logger.info(self.stream_log)
+            self.log_metrics()
+            logger.debug(f"rejections by filter stage: {dict(self.filter_rejections)}")
+            logger.debug(
+                f"comment outbox depth: {len(self.comment_outbox)}, "
+                f"dropped full: {self.comment_outbox.dropped_full}, "
+                f"dropped stale: {self.comment_outbox.dropped_stale}"
+            )
+            logger.debug(
+                f"bad comment reply checks: {self.comment_sweeper.reply_checks}, "
+                f"skipped: {self.comment_sweeper.reply_checks_skipped}"
+            )
+            logger.debug(
+                f"youtube cache hits: {self.youtube_cache.hits}, "
+                f"disk hits: {self.youtube_cache.disk_hits}, "
+                f"misses: {self.youtube_cache.misses}"
+            )
             self.stream_log = ""
 
-    def handle_submission(self, submission: Submission):
+    def log_submission(self, submission: Submission, msg: str):
         self.append_to_stream_log("-")
-        commented, msg = self.parse_submission(submission)
         if msg:
-            if getattr(logging, LOGLEVEL) <= logging.DEBUG:
-                submission_dict = dict(submission.__rich_repr__())
-                submission_dict.update({"msg": msg})
-                logger.debug(submission_dict)
+            # only build the payload if it will be logged
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(submission_log_payload(submission, msg))
             else:
                 self.append_to_stream_log(".")
-        if commented:
-            self.handle_comment_sleep()
+
+    def handle_submission(self, submission: Submission):
+        comment, msg = self.evaluate_submission(submission)
+        self.log_submission(submission, msg)
+        if comment is not None:
+            self.comment_outbox.push(submission, comment)
+        self.handle_comment_outbox()
         self.handle_delete_bad_comments()
 
     def stream_new_submissions(self):
         """continuosly stream new submissions to all subreddits"""
         self.login()
-        for submission in self.r.subreddit("all").stream.submissions():
-            self.handle_submission(submission)
+        try:
+            if self.engine == "async":
+                asyncio.run(AsyncEngine(self).run())
+                return
+            for submission in self.submission_stream():
+                self.handle_submission(submission)
+                self.checkpoint.mark(submission)
+        finally:
+            # marks since the last save would be lost, e.g. on an error or shutdown
+            self.checkpoint.flush()
+
+    def submission_stream(
+        self, pause_after: Optional[int] = None
+    ) -> Iterator[Optional[Submission]]:
+        """
+        submissions posted since the checkpoint, oldest first, then the stream.
+        /new is paged 100 submissions per request, back to the checkpoint or backfill_limit.
+        the stream starts with the newest ~100 submissions, which are skipped if they've
+        been processed or backfilled already.
+        """
+        subreddit = self.r.subreddit("all")
+        backfilled = self.checkpoint.backfill(subreddit.new(limit=self.backfill_limit))
+        if backfilled:
+            logger.info(f"backfilling {len(backfilled)} submission(s)")
+            self.hydrate_subreddit_info(backfilled)
+        yield from backfilled
+        backfilled_ids = {submission.id for submission in backfilled}
+        for submission in subreddit.stream.submissions(pause_after=pause_after):
+            if submission is not None and (
+                submission.id in self.checkpoint or submission.id in backfilled_ids
+            ):
+                continue
+            yield submission
+
+    def prefetch_youtube_metadata(self, submission: Submission):
+        """
+        warm youtube_cache for submissions which pass the filter stages that don't use praw.
+        safe to call from worker threads, since it only reads fields already in the listing.
+        """
+        if self.run_filter_stages(submission, {}, self.local_filter_stages):
+            return
+        try:
+            self.youtube_cache.get(submission.url)
+        except Exception as e:
+            # evaluate_submission fetches again and handles the error as usual
+            logger.debug(f"Failed to prefetch {submission.url}. Error:\n{e}")
+
+    def drain_comment_outbox(self):
+        """comment on everything left in the outbox, waiting comment_wait_time between comments"""
+        while self.comment_outbox:
+            delta = datetime.now() - self.last_commented
+            seconds_to_sleep = self.comment_wait_time * 60 - delta.total_seconds()
+            if seconds_to_sleep > 0:
+                logger.info(f"sleeping for {seconds_to_sleep:.0f} second(s)")
+                time.sleep(seconds_to_sleep)
+            self.handle_comment_outbox()
 
     def batch_rising_submissions(self):
         """parse a set number of rising submissions. use with cron"""
         self.login()
-        for submission in self.r.subreddit("all").rising(
-            limit=self.batch_submission_limit
-        ):
-            self.handle_submission(submission)
+        submissions = list(
+            self.r.subreddit("all").rising(limit=self.batch_submission_limit)
+        )
+        # praw's Reddit instance isn't thread safe, so only youtube fetches run in threads.
+        # everything else is evaluated, logged and commented on in order on this thread.
+        with ThreadPoolExecutor(max_workers=self.batch_workers) as executor:
+            list(executor.map(self.prefetch_youtube_metadata, submissions))
+        self.hydrate_subreddit_info(submissions)
+        for submission in submissions:
+            comment, msg = self.evaluate_submission(submission)
+            self.log_submission(submission, msg)
+            if comment is not None:
+                self.comment_outbox.push(submission, comment)
+            self.handle_comment_outbox()
+            self.handle_delete_bad_comments()
+        self.drain_comment_outbox()
 
     def parse_specific_submission(self, reddit_post_url: str):
+        self.parse_specific_submissions([reddit_post_url])
+
+    def parse_specific_submissions(self, reddit_post_urls: List[str]):
+        """parse submissions by url, fetched 100 per request"""
         self.login()
-        submission = self.r.submission(url=reddit_post_url)
-        self.parse_submission(submission)
+        hydrator = Hydrator(self.r)
+        for reddit_post_url in reddit_post_urls:
+            # submission fullnames are the t3_ prefix and id
+            hydrator.add(f"t3_{Submission.id_from_url(reddit_post_url)}")
+        submissions = list(hydrator.resolve().values())
+        self.hydrate_subreddit_info(submissions)
+        for submission in submissions:
+            _, msg = self.parse_submission(submission)
+            self.log_submission(submission, msg)
 
     def main(self):
-        retries = 0
-        while retries < self.connection_retry_limit:
-            try:
-                self.stream_new_submissions()
-            except (
-                RequestException,
-                ResponseException,
-                ServerError,
-                ConnectionError,
-                ReadTimeout,
-            ) as e:
-                retries += 1
-                logger.error(f"Error:\n{e}")
-                logger.info(f"Retrying in {self.connection_retry_wait_time} minute(s).")
-                time.sleep(self.connection_retry_wait_time * 60)
+        """stream until an error which isn't retried, or connection_retry_limit failures in a row"""
+
+        def on_retry(error: BaseException, delay: float):
+            logger.error(f"Error:\n{error}")
+            logger.info(f"Retrying in {delay:.0f} second(s).")
+            if self.metrics is not None:
+                self.metrics.count("retries", error=type(error).__name__)
+
+        self.retry_engine.run(self.stream_new_submissions, on_retry)
 
 
 if __name__ == "__main__":
     load_dotenv()
+    # heroku sends SIGTERM before restarting a dyno. exit normally instead of being killed,
+    # so finally blocks run, e.g. to save the stream checkpoint
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     # need to cast to int for values coming from .env file
-    CONNECTION_RETRY_LIMIT = int(os.getenv("connection_retry_limit", 3))
+    # consecutive failures before giving up, 0 retries forever
+    CONNECTION_RETRY_LIMIT = int(os.getenv("connection_retry_limit", 0))
+    # minutes before the first retry after a connection error, doubling up to the max
     CONNECTION_RETRY_WAIT_TIME = int(os.getenv("connection_retry_wait_time", 1))
+    CONNECTION_RETRY_MAX_WAIT_TIME = int(
+        os.getenv("connection_retry_max_wait_time", 30)
+    )
     # can hit api limits if < 10
     COMMENT_WAIT_TIME = int(os.getenv("comment_wait_time", 10))
     CHECK_BAD_COMMENT_WAIT_TIME = int(os.getenv("check_bad_comment_wait_time", 10))
+    # how many of the bot's newest comments to check for bad comments
+    CHECK_BAD_COMMENT_LIMIT = int(os.getenv("check_bad_comment_limit", 100))
+    # replies or inbox. inbox only reads new replies instead of polling each comment's replies
+    BAD_BOT_DETECTION = os.getenv("bad_bot_detection", "replies")
     BATCH_SUBMISSION_LIMIT = int(os.getenv("batch_submission_limit", 1000))
+    # threads used to fetch youtube metadata in batch_rising_submissions
+    BATCH_WORKERS = int(os.getenv("batch_workers", 8))
+    # seconds each youtube request has to finish in
+    YOUTUBE_DEADLINE = int(os.getenv("youtube_deadline", 10))
     GIT_REPO = os.getenv("git_repo", "")
+    KARMA_CACHE_TTL = int(os.getenv("karma_cache_ttl", 60))
+    SUBREDDIT_CACHE_TTL = int(os.getenv("subreddit_cache_ttl", 60))
+    SUBREDDIT_CACHE_SIZE = int(os.getenv("subreddit_cache_size", 5000))
+    YOUTUBE_CACHE_SIZE = int(os.getenv("youtube_cache_size", 1000))
+    # optional path to sqlite db, so youtube metadata survives restarts
+    YOUTUBE_CACHE_DB = os.getenv("youtube_cache_db", "")
+    # sync or async. async keeps reading the stream while waiting to comment
+    ENGINE = os.getenv("engine", "sync")
+    # metrics are off unless either is set. port serves prometheus metrics at /metrics,
+    # interval logs a summary every n minutes
+    METRICS_PORT = int(os.getenv("metrics_port", 0))
+    METRICS_LOG_INTERVAL = int(os.getenv("metrics_log_interval", 0))
+    # how many qualifying submissions can wait to be commented on, and for how many minutes
+    COMMENT_OUTBOX_SIZE = int(os.getenv("comment_outbox_size", 10))
+    COMMENT_MAX_AGE = int(os.getenv("comment_max_age", 60))
+    # optional path to file of submission ids already commented on, so it survives restarts
+    COMMENTED_INDEX_PATH = os.getenv("commented_index_path", "")
+    # optional path to file of where the stream got to, so restarts backfill what was missed
+    CHECKPOINT_PATH = os.getenv("checkpoint_path", "")
+    # how far back through /new to backfill after a restart
+    BACKFILL_LIMIT = int(os.getenv("backfill_limit", 1000))
     Bot(
         connection_retry_limit=CONNECTION_RETRY_LIMIT,
         connection_retry_wait_time=CONNECTION_RETRY_WAIT_TIME,
+        connection_retry_max_wait_time=CONNECTION_RETRY_MAX_WAIT_TIME,
         comment_wait_time=COMMENT_WAIT_TIME,
         check_bad_comment_wait_time=CHECK_BAD_COMMENT_WAIT_TIME,
+        check_bad_comment_limit=CHECK_BAD_COMMENT_LIMIT,
+        bad_bot_detection=BAD_BOT_DETECTION,
         batch_submission_limit=BATCH_SUBMISSION_LIMIT,
+        batch_workers=BATCH_WORKERS,
+        youtube_deadline=YOUTUBE_DEADLINE,
         git_repo=GIT_REPO,
+        karma_cache_ttl=KARMA_CACHE_TTL,
+        subreddit_cache_ttl=SUBREDDIT_CACHE_TTL,
+        subreddit_cache_size=SUBREDDIT_CACHE_SIZE,
+        youtube_cache_size=YOUTUBE_CACHE_SIZE,
+        youtube_cache_db=YOUTUBE_CACHE_DB,
+        engine=ENGINE,
+        metrics_port=METRICS_PORT,
+        metrics_log_interval=METRICS_LOG_INTERVAL,
+        comment_outbox_size=COMMENT_OUTBOX_SIZE,
+        comment_max_age=COMMENT_MAX_AGE,
+        commented_index_path=COMMENTED_INDEX_PATH,
+        checkpoint_path=CHECKPOINT_PATH,
+        backfill_limit=BACKFILL_LIMIT,
     ).main()
@@ -1,75 +1,77 @@
 # https://www.reddit.com/wiki/bottiquette omit /r/suicidewatch and /r/depression
 # note: lowercase for case insensitive match
 
-blacklist = [
-    # https://www.reddit.com/r/Bottiquette/wiki/robots_txt_json
-    "anime",
-    "asianamerican",
-    "askhistorians",
-    "askscience",
-    "askreddit",
-    "aww",
-    "chicagosuburbs",
-    "cosplay",
-    "cumberbitches",
-    "d3gf",
-    "deer",
-    "depression",
-    "depthhub",
-    "drinkingdollars",
-    "forwardsfromgrandma",
-    "geckos",
-    "giraffes",
-    "grindsmygears",
-    "indianfetish",
-    "me_irl",
-    "misc",
-    "movies",
-    "mixedbreeds",
-    "news",
-    "newtotf2",
-    "omaha",
-    "petstacking",
-    "pics",
-    "pigs",
-    "politicaldiscussion",
-    "politics",
-    "programmingcirclejerk",
-    "raerthdev",
-    "rants",
-    "runningcirclejerk",
-    "salvia",
-    "science",
-    "seiko",
-    "shoplifting",
-    "sketches",
-    "sociopath",
-    "suicidewatch",
-    "talesfromtechsupport",
-    "torrent",
-    "torrents",
-    "trackers",
-    "tr4shbros",
-    "unitedkingdom",
-    "crucibleplaybook",
-    "cassetteculture",
-    "italy_SS",
-    "DimmiOuija",
-    # no bots allowed but not on bottiquette
-    "todayilearned",
-    # non-english speaking
-    "hololive",
-    "internetbrasil",
-    "puebla",
-    "chile",
-    "saintrampalji",
-    # needs more karma
-    "centrist",
-    "conspiracy",
-    # handle timestamp in youtube title
-    "dauntless",
-    # timestamps usually not a skip point
-    "speedrun",
-]
+blacklist = frozenset(
+    [
+        # https://www.reddit.com/r/Bottiquette/wiki/robots_txt_json
+        "anime",
+        "asianamerican",
+        "askhistorians",
+        "askscience",
+        "askreddit",
+        "aww",
+        "chicagosuburbs",
+        "cosplay",
+        "cumberbitches",
+        "d3gf",
+        "deer",
+        "depression",
+        "depthhub",
+        "drinkingdollars",
+        "forwardsfromgrandma",
+        "geckos",
+        "giraffes",
+        "grindsmygears",
+        "indianfetish",
+        "me_irl",
+        "misc",
+        "movies",
+        "mixedbreeds",
+        "news",
+        "newtotf2",
+        "omaha",
+        "petstacking",
+        "pics",
+        "pigs",
+        "politicaldiscussion",
+        "politics",
+        "programmingcirclejerk",
+        "raerthdev",
+        "rants",
+        "runningcirclejerk",
+        "salvia",
+        "science",
+        "seiko",
+        "shoplifting",
+        "sketches",
+        "sociopath",
+        "suicidewatch",
+        "talesfromtechsupport",
+        "torrent",
+        "torrents",
+        "trackers",
+        "tr4shbros",
+        "unitedkingdom",
+        "crucibleplaybook",
+        "cassetteculture",
+        "italy_SS",
+        "DimmiOuija",
+        # no bots allowed but not on bottiquette
+        "todayilearned",
+        # non-english speaking
+        "hololive",
+        "internetbrasil",
+        "puebla",
+        "chile",
+        "saintrampalji",
+        # needs more karma
+        "centrist",
+        "conspiracy",
+        # handle timestamp in youtube title
+        "dauntless",
+        # timestamps usually not a skip point
+        "speedrun",
+    ]
+)
 
 min_karma_dict = {"superstonk": 1200}
@@ -0,0 +1,85 @@
+# Standard Library
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    bounded LRU cache where entries also expire ttl seconds after they were set.
+    falsy values (e.g. user_is_banned = False) are cached like any other value.
+    safe to share between threads. get_or_set doesn't hold the lock while fetching,
+    so two threads missing the same key at once may both fetch it.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: float = 60 * 60,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.lookup(key)[0]
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        returns (found, value) so cached None values can be told apart from misses.
+        doesn't affect hit and miss counts.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self.entries[key]
+                return False, None
+            self.entries.move_to_end(key)
+            return True, value
+
+    def counted_lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        with self.lock:
+            found, value = self.lookup(key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found, value
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        found, value = self.counted_lookup(key)
+        return value if found else default
+
+    def set(self, key: Hashable, value: Any):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                # evict least recently used
+                self.entries.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        found, value = self.counted_lookup(key)
+        if found:
+            return value
+        value = fn()
+        self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,63 @@
+# Standard Library
+import time
+from bisect import insort
+from itertools import count
+from typing import List, Optional, Tuple
+
+# Third party
+from praw.models import Submission
+
+
+class CommentOutbox:
+    """
+    bounded queue of comments waiting for the comment rate limit.
+    the highest priority submission is commented on first, and when the outbox is full
+    the lowest priority one is dropped. submissions older than max_age are dropped as stale.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10,
+        max_age: float = 60 * 60,
+    ):
+        self.max_size = max_size
+        self.max_age = max_age
+        # sorted lowest priority first. the counter breaks ties in favour of newer entries.
+        self.entries: List[Tuple[float, int, Submission, str]] = []
+        self.counter = count()
+        self.dropped_full = 0
+        self.dropped_stale = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def age(self, submission: Submission) -> float:
+        return time.time() - submission.created_utc
+
+    def priority(self, submission: Submission) -> float:
+        """
+        newer submissions with a higher score first, so the comment is seen by more people.
+        same idea as the hacker news ranking https://news.ycombinator.com/item?id=1781417
+        """
+        age_hours = max(self.age(submission), 0) / (60 * 60)
+        return (max(submission.score, 0) + 1) / (age_hours + 2) ** 1.8
+
+    def push(self, submission: Submission, comment: str) -> bool:
+        """returns False if the submission was dropped straight away"""
+        entry = (self.priority(submission), next(self.counter), submission, comment)
+        insort(self.entries, entry)
+        if len(self.entries) > self.max_size:
+            self.dropped_full += 1
+            dropped = self.entries.pop(0)
+            return dropped is not entry
+        return True
+
+    def pop(self) -> Optional[Tuple[Submission, str]]:
+        """highest priority submission which isn't stale, or None if there isn't one"""
+        while self.entries:
+            _, _, submission, comment = self.entries.pop()
+            if self.age(submission) > self.max_age:
+                self.dropped_stale += 1
+                continue
+            return submission, comment
+        return None
@@ -0,0 +1,88 @@
+# Standard Library
+import time
+from typing import Dict, Iterable, Optional
+
+# Third party
+from praw.models import Comment
+
+
+class SweptComment:
+    __slots__ = ("score", "reply_count", "interval", "next_check")
+
+    def __init__(self, score: int, interval: float):
+        self.score = score
+        # None until replies have been fetched once
+        self.reply_count: Optional[int] = None
+        self.interval = interval
+        # check straight away the first time a comment is seen
+        self.next_check = 0.0
+
+
+class CommentSweeper:
+    """
+    decide which of the bot's comments need their replies fetched when checking for bad comments.
+    score comes with the listing of the bot's comments, but replies need a request per comment,
+    so they're only fetched when due. each check that finds nothing new doubles the wait
+    (up to max_interval), so young comments are checked often and settled ones rarely.
+    a score change or a new reply resets the wait to min_interval.
+    comments older than max_age are never checked for replies again.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 10 * 60,
+        max_interval: float = 24 * 60 * 60,
+        max_age: float = 7 * 24 * 60 * 60,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_age = max_age
+        self.comments: Dict[str, SweptComment] = {}
+        self.reply_checks = 0
+        self.reply_checks_skipped = 0
+
+    def __len__(self) -> int:
+        return len(self.comments)
+
+    def replies_due(self, comment: Comment) -> bool:
+        """
+        record the comment's latest score, and return True if its replies should be fetched.
+        """
+        now = time.time()
+        if now - comment.created_utc > self.max_age:
+            self.comments.pop(comment.id, None)
+            self.reply_checks_skipped += 1
+            return False
+        swept = self.comments.get(comment.id)
+        if swept is None:
+            swept = self.comments[comment.id] = SweptComment(
+                comment.score, self.min_interval
+            )
+        elif swept.score != comment.score:
+            swept.score = comment.score
+            swept.interval = self.min_interval
+            swept.next_check = min(swept.next_check, now + self.min_interval)
+        if now < swept.next_check:
+            self.reply_checks_skipped += 1
+            return False
+        self.reply_checks += 1
+        return True
+
+    def checked_replies(self, comment: Comment, reply_count: int):
+        """back off if nothing changed since the last check"""
+        swept = self.comments.get(comment.id)
+        if swept is None:
+            return
+        changed = swept.reply_count is not None and swept.reply_count != reply_count
+        if changed:
+            swept.interval = self.min_interval
+        swept.next_check = time.time() + swept.interval
+        if not changed:
+            swept.interval = min(swept.interval * 2, self.max_interval)
+        swept.reply_count = reply_count
+
+    def forget_missing(self, comment_ids: Iterable[str]):
+        """stop tracking comments which weren't in the latest listing, e.g. deleted ones"""
+        keep = set(comment_ids)
+        for comment_id in [c for c in self.comments if c not in keep]:
+            del self.comments[comment_id]
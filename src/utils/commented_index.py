@@ -0,0 +1,35 @@
+# Standard Library
+import os
+import threading
+from typing import Set
+
+
+class CommentedIndex:
+    """
+    ids of submissions the bot has already commented on.
+    loaded into a set at startup, and if path is set, each new id is appended to that file
+    so the index survives restarts. without a path it only lasts as long as the process.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.ids: Set[str] = set()
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.ids.update(line.strip() for line in f if line.strip())
+
+    def __contains__(self, submission_id: str) -> bool:
+        return submission_id in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, submission_id: str):
+        with self.lock:
+            if submission_id in self.ids:
+                return
+            self.ids.add(submission_id)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(f"{submission_id}\n")
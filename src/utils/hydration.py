@@ -0,0 +1,51 @@
+# Standard Library
+from typing import Any, Dict, Iterable, List
+
+# /api/info takes up to this many fullnames or subreddit names per request
+batch_size = 100
+
+
+def chunks(items: List[str], size: int = batch_size) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class Hydrator:
+    """
+    collect fullnames and subreddit names which need fetching, then resolve them all with
+    reddit.info, 100 per request, instead of praw lazily fetching each object on first use.
+    objects which don't exist (or can't be seen) are missing from the results.
+    """
+
+    def __init__(self, reddit: Any):
+        self.reddit = reddit
+        # dicts as ordered sets, so results come back in the order they were added
+        self.pending_fullnames: Dict[str, None] = {}
+        self.pending_subreddits: Dict[str, None] = {}
+        self.requests = 0
+
+    def add(self, fullname: str):
+        self.pending_fullnames[fullname] = None
+
+    def add_subreddit(self, name: str):
+        self.pending_subreddits[name.lower()] = None
+
+    def __len__(self) -> int:
+        return len(self.pending_fullnames) + len(self.pending_subreddits)
+
+    def resolve(self) -> Dict[str, Any]:
+        """
+        fetch everything pending. returns fullname: object, and lowercase subreddit name: subreddit
+        """
+        resolved: Dict[str, Any] = {}
+        for chunk in chunks(list(self.pending_fullnames)):
+            self.requests += 1
+            for thing in self.reddit.info(fullnames=chunk):
+                resolved[thing.fullname] = thing
+        for chunk in chunks(list(self.pending_subreddits)):
+            self.requests += 1
+            for subreddit in self.reddit.info(subreddits=chunk):
+                resolved[subreddit.display_name.lower()] = subreddit
+        self.pending_fullnames = {}
+        self.pending_subreddits = {}
+        return resolved
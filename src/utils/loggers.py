@@ -1,40 +1,160 @@
 # Standard Library
+import atexit
+import json
 import logging
 import os
-from typing import Any, Callable, Generator, Tuple
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, Generator, List, Tuple
 
 # Third party
 from praw.models import Comment, Submission
 from rich.logging import RichHandler
 
 
-def setup_and_get_logger(name: str, loglevel: str):
+class JsonFormatter(logging.Formatter):
+    """
+    one compact json object per line. dict messages are merged into the object,
+    so structured payloads stay structured.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, dict):
+            entry.update(record.msg)
+        else:
+            entry["msg"] = record.getMessage()
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler formats records before queueing them, on the thread which logged.
+    the queue is in process, so pass records through as they are and leave all formatting
+    to the listener thread. messages and args must not be mutated after logging.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def create_json_queue_handler() -> Tuple[QueueHandler, QueueListener]:
+    """handler which queues records, and a listener which writes them to stderr as json lines"""
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+    return DeferredQueueHandler(log_queue), QueueListener(log_queue, stream_handler)
+
+
+def setup_and_get_logger(name: str, loglevel: str, log_format: str = ""):
+    """
+    log_format (default from the log_format env var) is rich for local development,
+    or json for compact json lines written from a background thread in production.
+    """
     logger = logging.getLogger(name)
-    logging.basicConfig(level=loglevel, handlers=[RichHandler()])
+    # basicConfig only configures the root logger the first time, same as before
+    if not logging.getLogger().handlers:
+        log_format = log_format or os.environ.get("log_format", "rich")
+        handler: logging.Handler = RichHandler()
+        if log_format == "json":
+            handler, listener = create_json_queue_handler()
+            listener.start()
+            # flush whatever is still queued on exit
+            atexit.register(listener.stop)
+        logging.basicConfig(level=loglevel, handlers=[handler])
     return logger
 
 
+def submission_log_payload(submission: Submission, msg: str) -> Dict[str, Any]:
+    """
+    submission fields for logs, only from attributes praw has already loaded.
+    reading anything else from a lazy praw object would fetch it just for logging.
+    """
+    loaded = vars(submission)
+    payload = {
+        key: loaded[key] for key in ["id", "permalink", "title", "url"] if key in loaded
+    }
+    payload["msg"] = msg
+    return payload
+
+
+# read_field's value for fields which aren't loaded
+missing = object()
+
+
+def read_field(obj: Any, name: str, deep: bool = False) -> Any:
+    """
+    obj's attribute if it is already loaded, otherwise missing.
+    praw fetches the whole object for any attribute it doesn't have yet, and only deep
+    reads go through it. replies and submission are properties over _replies and _submission.
+    """
+    if deep:
+        return getattr(obj, name, missing)
+    loaded = vars(obj)
+    if name in loaded:
+        return loaded[name]
+    value = loaded.get(f"_{name}")
+    return missing if value is None else value
+
+
+def loaded_pairs(
+    obj: Any, names: List[str], deep: bool = False
+) -> Generator[Tuple[str, Any], None, None]:
+    for name in names:
+        value = read_field(obj, name, deep)
+        if value is not missing:
+            yield name, value
+
+
 def generate_submission_rich_repr(reddit_url: str) -> Callable:
-    def submission_rich_repr(self):
-        yield "id", self.id
-        yield "permalink", f"{reddit_url}{self.permalink}"
-        yield "title", self.title
-        yield "url", self.url
+    def submission_rich_repr(self, deep: bool = False):
+        for (name, value) in loaded_pairs(
+            self, ["id", "permalink", "title", "url"], deep
+        ):
+            yield name, f"{reddit_url}{value}" if name == "permalink" else value
 
     return submission_rich_repr
 
 
-def comment_rich_repr(self) -> Generator[Tuple[str, Any], None, None]:
-    yield "id", self.id
-    yield "body", self.body
-    yield "score", self.score
-    yield "replies", [child.body for child in self.replies]
-    yield "submission", self.submission
+def comment_rich_repr(
+    self, deep: bool = False
+) -> Generator[Tuple[str, Any], None, None]:
+    yield from loaded_pairs(self, ["id", "body", "score"], deep)
+    replies = read_field(self, "replies", deep)
+    if replies is not missing:
+        bodies = [read_field(child, "body", deep) for child in replies]
+        yield "replies", [body for body in bodies if body is not missing]
+    submission = read_field(self, "submission", deep)
+    if submission is not missing and submission is not None:
+        yield "submission", snapshot_str(submission, deep)
+
+
+def snapshot(obj: Any, deep: bool = False) -> Tuple[Tuple[str, Any], ...]:
+    """
+    obj's __rich_repr__ fields, cached on obj until praw fetches it.
+    only fields which are already loaded are read, so logging and messaging never cost requests.
+    deep opts in to reading every field, fetching whatever isn't loaded.
+    """
+    key = "_deep_snapshot" if deep else "_snapshot"
+    loaded = vars(obj)
+    cached = loaded.get(key)
+    if cached is not None and cached[0] == loaded.get("_fetched"):
+        return cached[1]
+    fields = tuple(obj.__rich_repr__(deep=deep))
+    # set in __dict__ directly, praw's __setattr__ treats some attributes specially
+    loaded[key] = (loaded.get("_fetched"), fields)
+    return fields
 
 
-def rich_to_str(self) -> str:
+def snapshot_str(obj: Any, deep: bool = False) -> str:
     """
-    convert from rich_repr to markdown bulletlist like str
+    convert from snapshot to markdown bulletlist like str
     """
 
     def format_pair(pair: Tuple, just=16, indent=4) -> str:
@@ -43,14 +163,15 @@ def rich_to_str(self) -> str:
             return f"{('* ' + pair[0] + ':')}\n{str(pair[1]).replace('*', indented_bullet)}"
         return f"{('* ' + pair[0] + ':').ljust(just)} {pair[1]}"
 
-    return "\n".join([format_pair(tup) for tup in self.__rich_repr__()])
+    if not hasattr(type(obj), "__rich_repr__"):
+        return str(obj)
+    return "\n".join([format_pair(tup) for tup in snapshot(obj, deep)])
 
 
 def monkey_patch_praw_objs(reddit_url: str):
     """
-    monkeypatch praw models for better logging
+    monkeypatch praw models for better logging.
+    __str__ is left alone, praw's __eq__ and __hash__ use it. use snapshot_str instead.
     """
     Submission.__rich_repr__ = generate_submission_rich_repr(reddit_url)
-    Submission.__str__ = rich_to_str
     Comment.__rich_repr__ = comment_rich_repr
-    Comment.__str__ = rich_to_str
@@ -0,0 +1,147 @@
+# Standard Library
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Tuple
+
+# Third party
+import requests
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# reddit sends these on every api response
+# https://github.com/reddit-archive/reddit/wiki/API#rules
+rate_limit_headers = {
+    "x-ratelimit-remaining": "reddit_ratelimit_remaining",
+    "x-ratelimit-used": "reddit_ratelimit_used",
+    "x-ratelimit-reset": "reddit_ratelimit_reset_seconds",
+}
+
+
+class Metrics:
+    """
+    counters, gauges and timers (count and sum of seconds, like a prometheus summary).
+    Bot only creates one when metrics are enabled, and only wraps its stages with timers then,
+    so there is no overhead when disabled.
+    safe to update from worker threads.
+    """
+
+    def __init__(self, prefix: str = "ytbot"):
+        self.prefix = prefix
+        self.counters: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+        self.gauges: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+        # name: labels: [count, sum]
+        self.timers: Dict[str, Dict[Labels, List[float]]] = defaultdict(dict)
+        # called before rendering, to update gauges which are cheaper to read than to track
+        self.collectors: List[Callable[[], None]] = []
+        self.lock = threading.Lock()
+
+    def count(self, name: str, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            values = self.counters[name]
+            values[key] = values.get(key, 0) + amount
+
+    def gauge(self, name: str, value: float, **labels: str):
+        with self.lock:
+            self.gauges[name][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, seconds: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            timer = self.timers[name].setdefault(key, [0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+
+    def timed(self, name: str, fn: Callable, **labels: str) -> Callable:
+        """wrap fn so every call is observed, including calls which raise"""
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(name, time.perf_counter() - start, **labels)
+
+        return wrapper
+
+    def record_response(self, response: requests.Response, *args, **kwargs):
+        """requests response hook, counts api calls and keeps the latest rate limit headers"""
+        self.count("reddit_api_calls", status=str(response.status_code))
+        for (header, name) in rate_limit_headers.items():
+            value = response.headers.get(header)
+            if value is not None:
+                try:
+                    self.gauge(name, float(value))
+                except ValueError:
+                    pass
+
+    def render(self) -> str:
+        """prometheus text exposition format"""
+
+        def line(name: str, labels: Labels, value: float) -> str:
+            label_str = ",".join(f'{k}="{v}"' for (k, v) in labels)
+            return f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}"
+
+        for collect in self.collectors:
+            collect()
+        lines = []
+        with self.lock:
+            for (name, values) in sorted(self.counters.items()):
+                metric = f"{self.prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.extend(line(metric, k, v) for (k, v) in sorted(values.items()))
+            for (name, values) in sorted(self.gauges.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.extend(line(metric, k, v) for (k, v) in sorted(values.items()))
+            for (name, timers) in sorted(self.timers.items()):
+                metric = f"{self.prefix}_{name}_seconds"
+                lines.append(f"# TYPE {metric} summary")
+                for (k, (count, total)) in sorted(timers.items()):
+                    lines.append(line(f"{metric}_count", k, count))
+                    lines.append(line(f"{metric}_sum", k, total))
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """short one line per timer, for logs"""
+        lines = []
+        with self.lock:
+            for (name, timers) in sorted(self.timers.items()):
+                for (labels, (count, total)) in sorted(timers.items()):
+                    label = " ".join(v for (_, v) in labels)
+                    mean_ms = total / count * 1000 if count else 0
+                    lines.append(
+                        f"{name} {label}: {count:.0f} calls, mean {mean_ms:.2f}ms"
+                    )
+            for (name, values) in sorted(self.counters.items()):
+                total = sum(values.values())
+                lines.append(f"{name}: {total:.0f}")
+        return "\n".join(lines)
+
+
+def start_metrics_server(
+    metrics: Metrics, port: int, host: str = ""
+) -> ThreadingHTTPServer:
+    """serve metrics.render() at /metrics from a daemon thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any):
+            # scrapes every few seconds would flood the bot's logs
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,269 @@
+"""
+record the submission stream to compressed jsonl, and replay recordings through Bot
+with local stand-ins for praw and pytube, so throughput can be measured without reddit.
+"""
+
+# Standard Library
+import gzip
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+# YouTubeTimestampRedditBot
+from src.utils.youtube import YouTubeMetadata
+
+
+def record_submissions(submissions: Iterable[Any], path: str, limit: int) -> int:
+    """write up to limit submissions to path as gzipped jsonl. returns how many were written"""
+    written = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for submission in submissions:
+            if written >= limit:
+                break
+            record = {
+                "id": submission.id,
+                "title": submission.title,
+                "url": submission.url,
+                "subreddit": submission.subreddit.display_name,
+                "created_utc": submission.created_utc,
+            }
+            f.write(json.dumps(record) + "\n")
+            written += 1
+    return written
+
+
+class Latency(NamedTuple):
+    """seconds each stand-in call sleeps for, to simulate network round trips"""
+
+    reddit: float = 0
+    youtube: float = 0
+
+
+class ReplaySubreddit:
+    def __init__(self, display_name: str, latency: Latency):
+        self.display_name = display_name
+        self.latency = latency
+
+    @property
+    def user_is_banned(self) -> bool:
+        time.sleep(self.latency.reddit)
+        return False
+
+
+class ReplaySubredditInfo:
+    """a subreddit from /api/info, with ban status already loaded"""
+
+    def __init__(self, display_name: str):
+        self.display_name = display_name
+        self.user_is_banned = False
+
+
+class ReplayCommentForest(list):
+    def __init__(self, latency: Latency):
+        super().__init__()
+        self.latency = latency
+
+    def replace_more(self, limit=32):
+        time.sleep(self.latency.reddit)
+        return []
+
+
+class ReplaySubmission:
+    """enough of praw's Submission for Bot, loaded from a recording"""
+
+    def __init__(self, record: Dict[str, Any], latency: Latency):
+        self.id = record["id"]
+        self.title = record["title"]
+        self.url = record["url"]
+        self.subreddit = ReplaySubreddit(record["subreddit"], latency)
+        self.created_utc = record["created_utc"]
+        self.permalink = f"/comments/{self.id}"
+        self.score = 1
+        self.comments = ReplayCommentForest(latency)
+        self.latency = latency
+
+    def __rich_repr__(self):
+        yield "id", self.id
+        yield "title", self.title
+        yield "url", self.url
+
+    def reply(self, body: str):
+        time.sleep(self.latency.reddit)
+
+
+def load_recording(
+    path: str, latency: Latency = Latency()
+) -> Iterator[ReplaySubmission]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield ReplaySubmission(json.loads(line), latency)
+
+
+class ReplayRedditor:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    @property
+    def comment_karma(self) -> int:
+        time.sleep(self.latency.reddit)
+        return 10_000
+
+    def message(self, subject: str, body: str):
+        time.sleep(self.latency.reddit)
+
+
+class ReplayReddit:
+    """
+    stand-in for bot.r. the bot has no comments to moderate and no replies in its inbox.
+    user.me().comments and inbox return this object, so new and comment_replies are the only
+    listings.
+    """
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def redditor(self, name: str) -> ReplayRedditor:
+        return ReplayRedditor(self.latency)
+
+    @property
+    def user(self) -> Any:
+        return self
+
+    def me(self) -> Any:
+        return self
+
+    @property
+    def comments(self) -> Any:
+        return self
+
+    @property
+    def inbox(self) -> Any:
+        return self
+
+    def new(self, limit: Optional[int] = None) -> List:
+        time.sleep(self.latency.reddit)
+        return []
+
+    def comment_replies(self, limit: Optional[int] = None) -> List:
+        time.sleep(self.latency.reddit)
+        return []
+
+    def info(
+        self,
+        fullnames: Optional[List[str]] = None,
+        subreddits: Optional[List[str]] = None,
+    ) -> List:
+        """only subreddits are looked up while replaying"""
+        time.sleep(self.latency.reddit)
+        return [ReplaySubredditInfo(name) for name in subreddits or []]
+
+
+def replay_youtube_fetch(latency: Latency) -> Callable[[str], YouTubeMetadata]:
+    """stand-in for fetch_youtube_metadata, every video is an hour long"""
+
+    def fetch(url: str) -> YouTubeMetadata:
+        time.sleep(latency.youtube)
+        return YouTubeMetadata(length=60 * 60, title="")
+
+    return fetch
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * p / 100), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class ReplayReport(NamedTuple):
+    submissions: int
+    seconds: float
+    # stage: (p50, p99) in seconds, for calls to that stage
+    stage_latency: Dict[str, tuple]
+    # blocks allocated (net) and peak bytes while replaying, if allocations were traced
+    allocated_blocks: Optional[int]
+    peak_bytes: Optional[int]
+
+    @property
+    def submissions_per_second(self) -> float:
+        return self.submissions / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.submissions} submissions in {self.seconds:.2f}s, "
+            f"{self.submissions_per_second:.0f} submissions/s"
+        ]
+        for (stage, (p50, p99)) in self.stage_latency.items():
+            lines.append(
+                f"{stage.ljust(20)} p50 {p50 * 1e6:10.1f} µs  p99 {p99 * 1e6:10.1f} µs"
+            )
+        if self.allocated_blocks is not None:
+            lines.append(
+                f"allocated blocks: {self.allocated_blocks}, peak: {self.peak_bytes} bytes"
+            )
+        return "\n".join(lines)
+
+
+def time_filter_stages(bot: Any, timings: Dict[str, List[float]]):
+    """wrap each of bot's filter stages to record how long every call takes"""
+
+    def timed(stage: str, check: Callable) -> Callable:
+        def wrapper(submission, candidate):
+            start = time.perf_counter()
+            try:
+                return check(submission, candidate)
+            finally:
+                timings[stage].append(time.perf_counter() - start)
+
+        return wrapper
+
+    bot.filter_stages = [
+        (stage, timed(stage, check)) for (stage, check) in bot.filter_stages
+    ]
+
+
+def replay(
+    bot: Any,
+    submissions: Iterable[ReplaySubmission],
+    latency: Latency = Latency(),
+    trace_allocations: bool = False,
+    hydrate_batch: int = 0,
+) -> ReplayReport:
+    """
+    feed submissions through bot.handle_submission, with praw and pytube replaced by stand-ins.
+    with hydrate_batch, subreddit ban status is fetched in bulk for each batch of that many
+    submissions first, like a backfill, instead of once per subreddit by filter_banned.
+    """
+    bot.r = ReplayReddit(latency)
+    bot.youtube_cache.fetch = replay_youtube_fetch(latency)
+    timings: Dict[str, List[float]] = defaultdict(list)
+    time_filter_stages(bot, timings)
+    if trace_allocations:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+    count = 0
+    start = time.perf_counter()
+    submission_iter = iter(submissions)
+    while batch := list(islice(submission_iter, hydrate_batch or 1)):
+        if hydrate_batch:
+            bot.hydrate_subreddit_info(batch)
+        for submission in batch:
+            bot.handle_submission(submission)
+            count += 1
+    seconds = time.perf_counter() - start
+    allocated_blocks = peak_bytes = None
+    if trace_allocations:
+        after = tracemalloc.take_snapshot()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        allocated_blocks = sum(
+            stat.count_diff for stat in after.compare_to(before, "filename")
+        )
+    stage_latency = {}
+    for (stage, _) in bot.filter_stages:
+        values = sorted(timings[stage])
+        stage_latency[stage] = (percentile(values, 50), percentile(values, 99))
+    return ReplayReport(count, seconds, stage_latency, allocated_blocks, peak_bytes)
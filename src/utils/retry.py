@@ -0,0 +1,112 @@
+# Standard Library
+import random
+import threading
+import time
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple, Type
+
+# Third party
+import requests
+from prawcore.exceptions import TooManyRequests
+
+
+class RetryPolicy(NamedTuple):
+    """wait base_delay seconds before the first retry, doubling each failure up to max_delay"""
+
+    base_delay: float
+    max_delay: float
+
+
+class RateLimitState:
+    """
+    the latest rate limit headers reddit sent, read from a requests response hook.
+    praw already paces requests from these, so they're only used to decide how long to wait
+    after an error, e.g. until the limit resets instead of guessing.
+    """
+
+    def __init__(self):
+        self.remaining: Optional[float] = None
+        self.reset_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def record_response(self, response: requests.Response, *args, **kwargs):
+        remaining = response.headers.get("x-ratelimit-remaining")
+        reset = response.headers.get("x-ratelimit-reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            with self.lock:
+                self.remaining = float(remaining)
+                self.reset_at = time.monotonic() + float(reset)
+        except ValueError:
+            pass
+
+    def seconds_until_reset(self) -> float:
+        """how long until requests are allowed again, 0 unless the limit is used up"""
+        with self.lock:
+            if self.remaining is None or self.reset_at is None or self.remaining >= 1:
+                return 0.0
+            return max(self.reset_at - time.monotonic(), 0.0)
+
+
+class RetryEngine:
+    """
+    call fn again after errors covered by policies, the first matching (error types, policy)
+    wins, so list subclasses first. other errors are raised.
+    waits back off exponentially with jitter per consecutive failure, so many restarts don't
+    retry in lockstep. a run which stayed up for healthy_after seconds before failing
+    resets the back-off. gives up after max_failures consecutive failures, never if 0.
+    """
+
+    def __init__(
+        self,
+        policies: List[Tuple[Tuple[Type[BaseException], ...], RetryPolicy]],
+        healthy_after: float = 10 * 60,
+        max_failures: int = 0,
+        rate_limit: Optional[RateLimitState] = None,
+    ):
+        self.policies = policies
+        self.healthy_after = healthy_after
+        self.max_failures = max_failures
+        self.rate_limit = rate_limit
+        self.failures = 0
+
+    def policy_for(self, error: BaseException) -> Optional[RetryPolicy]:
+        for (error_types, policy) in self.policies:
+            if isinstance(error, error_types):
+                return policy
+        return None
+
+    def delay(self, error: BaseException, policy: RetryPolicy) -> float:
+        backoff = min(policy.max_delay, policy.base_delay * 2 ** (self.failures - 1))
+        # somewhere in the upper half of the back-off
+        delay = backoff / 2 + random.random() * backoff / 2
+        retry_after = getattr(error, "retry_after", None)
+        if isinstance(error, TooManyRequests) and retry_after:
+            delay = max(delay, float(retry_after))
+        if self.rate_limit is not None:
+            delay = max(delay, self.rate_limit.seconds_until_reset())
+        return delay
+
+    def run(
+        self,
+        fn: Callable[[], Any],
+        on_retry: Optional[Callable[[BaseException, float], None]] = None,
+    ) -> Any:
+        """return what fn returns, retrying errors covered by policies"""
+        while True:
+            started = time.monotonic()
+            try:
+                return fn()
+            except Exception as e:
+                policy = self.policy_for(e)
+                if policy is None:
+                    raise
+                if time.monotonic() - started >= self.healthy_after:
+                    self.failures = 0
+                self.failures += 1
+                if self.max_failures and self.failures > self.max_failures:
+                    raise
+                delay = self.delay(e, policy)
+                if on_retry is not None:
+                    on_retry(e, delay)
+                time.sleep(delay)
@@ -0,0 +1,104 @@
+# Standard Library
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Set
+
+# Third party
+from praw.models import Submission
+
+
+class StreamCheckpoint:
+    """
+    the newest submission the bot has processed, and the ids of recently processed ones.
+    after a restart, backfill pages through /new back to the checkpoint so posts from the
+    downtime aren't missed, and seen skips what the stream replays from before the restart.
+    if path is set it's saved there (at most every save_interval seconds and on flush, written
+    to a temp file then renamed), so it survives restarts of the process, not just retries in
+    Bot.main.
+    """
+
+    def __init__(
+        self,
+        path: str = "",
+        max_ids: int = 1000,
+        save_interval: float = 10,
+    ):
+        self.path = path
+        self.save_interval = save_interval
+        self.fullname: Optional[str] = None
+        self.created_utc: Optional[float] = None
+        # oldest first, so the oldest id is forgotten once max_ids is reached
+        self.recent_ids: Deque[str] = deque(maxlen=max_ids)
+        self.ids: Set[str] = set()
+        self.saved_at = 0.0
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.fullname = state["fullname"]
+            self.created_utc = state["created_utc"]
+            self.recent_ids.extend(state["ids"])
+            self.ids.update(self.recent_ids)
+
+    def __contains__(self, submission_id: str) -> bool:
+        return submission_id in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mark(self, submission: Submission):
+        """record that submission has been processed"""
+        with self.lock:
+            if submission.id not in self.ids:
+                if len(self.recent_ids) == self.recent_ids.maxlen:
+                    self.ids.discard(self.recent_ids[0])
+                self.recent_ids.append(submission.id)
+                self.ids.add(submission.id)
+            # submissions can be processed out of order, keep the newest
+            if self.created_utc is None or submission.created_utc >= self.created_utc:
+                # submission fullnames are the t3_ prefix and id
+                self.fullname = f"t3_{submission.id}"
+                self.created_utc = submission.created_utc
+            if self.path and time.time() - self.saved_at >= self.save_interval:
+                self.save()
+
+    def flush(self):
+        """save now rather than after save_interval, e.g. when the stream stops"""
+        if not self.path or self.created_utc is None:
+            return
+        with self.lock:
+            self.save()
+
+    def save(self):
+        """write the checkpoint to path. call with lock held"""
+        state = {
+            "fullname": self.fullname,
+            "created_utc": self.created_utc,
+            "ids": list(self.recent_ids),
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        # a crash while writing leaves the previous checkpoint in place
+        os.replace(tmp_path, self.path)
+        self.saved_at = time.time()
+
+    def backfill(self, newest_first: Iterable[Submission]) -> List[Submission]:
+        """
+        submissions from newest_first (e.g. a /new listing) posted since the checkpoint and
+        not yet processed, oldest first. reads newest_first only as far back as the checkpoint,
+        and not at all without one.
+        """
+        if self.created_utc is None:
+            return []
+        missed = []
+        for submission in newest_first:
+            if submission.created_utc < self.created_utc:
+                break
+            if submission.id not in self.ids:
+                missed.append(submission)
+        missed.reverse()
+        return missed
@@ -1,6 +1,19 @@
 # Standard Library
 import time
-from typing import Any, List, Literal, Tuple, Union
+from bisect import bisect_right
+from itertools import accumulate, islice
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 # Third party
 # required for inifinte width lookback (?<=\s|^)
@@ -46,6 +59,126 @@ class TimestampParseError(Exception):
     pass
 
 
+class TitleTimestamp(NamedTuple):
+    raw: str
+    span: Tuple[int, int]
+    hours: Optional[int]
+    minutes: int
+    seconds: int
+    total_seconds: int
+
+
+class TimestampScanner:
+    """
+    scan a title for timestamps in a single pass.
+    patterns are compiled once, so the scanner should be built once and reused.
+    """
+
+    # https://stackoverflow.com/questions/6713310/regex-specify-space-or-start-of-string-and-space-or-end-of-string
+    space_or_start = r"(?<=\s|^)"
+    # :[0-5][0-9] required seconds
+    # ([0-5]?[0-9]) required minutes with optional leading 0
+    # ((?:[0-2]?[0-9]:)?) optional hours up to 29 (over 23 caught by is_valid_time)
+    hh_mm_ss = r"(?:([0-2]?[0-9]):)?([0-5]?[0-9]):([0-5][0-9])"
+    space_punctuation_or_end = r"(?=\s|\.\s|\,\s|$)"
+
+    def __init__(self):
+        # try the wrapped (standalone) timestamp first at each position, fall back to any timestamp.
+        # both alternatives end at the same place, so finditer walks the same candidates as findall would.
+        self.pattern = regex.compile(
+            f"{self.space_or_start}(?P<wrapped>{self.hh_mm_ss}){self.space_punctuation_or_end}"
+            f"|(?P<unwrapped>{self.hh_mm_ss})"
+        )
+
+    def scan(self, title: str) -> Optional[TitleTimestamp]:
+        """
+        return the first standalone timestamp in the title,
+        as long as no other timestamp appears before it.
+        """
+        first_candidate = None
+        for match in self.pattern.finditer(title):
+            if first_candidate is None:
+                first_candidate = match.group()
+            if match.group("wrapped") is None:
+                continue
+            # if there are multiple timestamps, only choose the first one.
+            if match.group() != first_candidate:
+                return None
+            raw_hours, raw_minutes, raw_seconds = match.groups()[1:4]
+            hours = int(raw_hours) if raw_hours is not None else None
+            minutes = int(raw_minutes)
+            seconds = int(raw_seconds)
+            return TitleTimestamp(
+                raw=match.group(),
+                span=match.span(),
+                hours=hours,
+                minutes=minutes,
+                seconds=seconds,
+                total_seconds=(hours or 0) * 3600 + minutes * 60 + seconds,
+            )
+        return None
+
+
+class AffixTrie:
+    """
+    index words so checking if text starts (or ends) with any of them
+    costs O(length of the longest word) rather than O(number of words).
+    duplicate words collapse into the same path.
+    """
+
+    # key marking the end of a word. never clashes with a character key.
+    end = ""
+
+    def __init__(self, words: Iterable[str], reverse: bool = False):
+        # reverse=True indexes words backwards for endswith checks
+        self.reverse = reverse
+        self.root: Dict[str, Any] = {}
+        self.size = 0
+        for word in words:
+            node = self.root
+            for char in word[::-1] if reverse else word:
+                node = node.setdefault(char, {})
+            if self.end not in node:
+                node[self.end] = True
+                self.size += 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def matches(self, text: str, index: int) -> bool:
+        """
+        reverse=False: text[index:].strip().lower() starts with an indexed word
+        reverse=True:  text[:index].strip().lower() ends with an indexed word
+        """
+        positions = (
+            range(index - 1, -1, -1) if self.reverse else range(index, len(text))
+        )
+        node = self.root
+        skipping_whitespace = True
+        for i in positions:
+            char = text[i]
+            if skipping_whitespace:
+                if char.isspace():
+                    continue
+                skipping_whitespace = False
+            # lowering can produce more than one character, e.g. "İ"
+            lowered = char.lower()
+            for c in lowered[::-1] if self.reverse else lowered:
+                if c not in node:
+                    return False
+                node = node[c]
+                if self.end in node:
+                    return True
+        return False
+
+
+timestamp_scanner = TimestampScanner()
+excluded_prefix_trie = AffixTrie(excluded_prefixes, reverse=True)
+excluded_suffix_trie = AffixTrie(excluded_suffixes)
+# every timestamp timestamp_scanner can accept contains this, so titles without it can be skipped
+candidate_pattern = regex.compile(r"[0-9]:[0-5][0-9]")
+
+
 def convert_timestamp_to_yt(timestamp: str) -> str:
     """
     e.g. arg: 01:22:35
@@ -75,25 +208,16 @@ def convert_timestamp_to_seconds(timestamp: str) -> int:
     return total
 
 
-def has_excluded_prefix(title: str, numeric_timestamp: regex.Match) -> bool:
+def has_excluded_prefix(title: str, span: Tuple[int, int]) -> bool:
     # handle cases like `beaten under 3:00`
     # https://www.reddit.com/r/bindingofisaac/comments/ptfbgm/beating_greedier_mode_in_under_300_with_only_1/
-    pre_timestamp = title[: numeric_timestamp.span()[0]]
-    return any(
-        [pre_timestamp.strip().lower().endswith(prefix) for prefix in excluded_prefixes]
-    )
+    return excluded_prefix_trie.matches(title, span[0])
 
 
-def has_excluded_suffix(title: str, numeric_timestamp: regex.Match) -> bool:
+def has_excluded_suffix(title: str, span: Tuple[int, int]) -> bool:
     # handle cases like `rally at 3:00 EST`
     # https://www.reddit.com/r/pga2k21/comments/pu2abg/will_be_reviewing_and_rating_a_hard_and_hardest/
-    post_timestamp = title[numeric_timestamp.span()[1] :]
-    return any(
-        [
-            post_timestamp.strip().lower().startswith(suffix)
-            for suffix in excluded_suffixes
-        ]
-    )
+    return excluded_suffix_trie.matches(title, span[1])
 
 
 def is_valid_time(timestamp: str) -> bool:
@@ -106,32 +230,52 @@ def is_valid_time(timestamp: str) -> bool:
         return False
 
 
+def format_title_timestamp_for_yt(title_timestamp: TitleTimestamp) -> str:
+    """
+    same output as convert_timestamp_to_yt, without re-parsing the raw timestamp.
+    e.g. 01:22:35 -> 1h22m35s
+    """
+    minutes_seconds = f"{title_timestamp.minutes}m{title_timestamp.seconds}s"
+    if title_timestamp.hours is None:
+        return minutes_seconds
+    return f"{title_timestamp.hours}h{minutes_seconds}"
+
+
 # https://github.com/python/mypy/issues/6113
 # needs to be python >=3.8
 def get_title_time(title: str) -> Union[Tuple[str, Any], Literal[False]]:
-    # https://stackoverflow.com/questions/6713310/regex-specify-space-or-start-of-string-and-space-or-end-of-string
-    space_or_start = r"(?<=\s|^)"
-    # :[0-5][0-9] required seconds
-    # ([0-5]?[0-9]) required minutes with optional leading 0
-    # ((?:[0-2]?[0-9]:)?) optional hours up to 29 (over 23 caught by is_valid_time)
-    hh_mm_ss = r"(((?:[0-2]?[0-9]:)?)([0-5]?[0-9]):[0-5][0-9])"
-    space_punctuation_or_end = r"(?=\s|\.\s|\,\s|$)"
-    hh_mm_ss_wrapped = f"{space_or_start}{hh_mm_ss}{space_punctuation_or_end}"
-    all_possible_timestamps = regex.findall(hh_mm_ss, title)
-    numeric_timestamp = regex.search(hh_mm_ss_wrapped, title)
-    if not numeric_timestamp:
+    title_timestamp = timestamp_scanner.scan(title)
+    if not title_timestamp:
         return False
-    if has_excluded_prefix(title, numeric_timestamp):
+    if has_excluded_prefix(title, title_timestamp.span):
         return False
-    if has_excluded_suffix(title, numeric_timestamp):
+    if has_excluded_suffix(title, title_timestamp.span):
         return False
-    raw_matched_timestamp = numeric_timestamp.group()
-    # if there are multiple timestamps, only choose the first one.
-    if raw_matched_timestamp != all_possible_timestamps[0][0]:
+    # minutes and seconds are bounded by the scanner's pattern,
+    # so only hours can fail is_valid_time (strptime %H is 0-23).
+    if title_timestamp.hours is not None and title_timestamp.hours > 23:
         return False
-    if not is_valid_time(raw_matched_timestamp):
+    if title_timestamp.total_seconds == 0:
         return False
-    if convert_timestamp_to_seconds(raw_matched_timestamp) == 0:
-        return False
-    parsed_timestamp = convert_timestamp_to_yt(raw_matched_timestamp)
-    return (parsed_timestamp, raw_matched_timestamp)
+    parsed_timestamp = format_title_timestamp_for_yt(title_timestamp)
+    return (parsed_timestamp, title_timestamp.raw)
+
+
+def parse_titles(
+    titles: Iterable[str], chunk_size: int = 1000
+) -> Generator[Tuple[str, Union[Tuple[str, Any], Literal[False]]], None, None]:
+    """
+    lazily yield (title, get_title_time(title)) for each title, in order.
+    titles are read chunk_size at a time, and each chunk is pre-filtered with a single
+    regex pass over the joined titles, so get_title_time only runs on possible timestamps.
+    """
+    iterator = iter(titles)
+    while chunk := list(islice(iterator, chunk_size)):
+        # offset of each title in the joined block, used to map matches back to titles
+        offsets = [0, *accumulate(len(title) + 1 for title in chunk)]
+        candidates = {
+            bisect_right(offsets, match.start()) - 1
+            for match in candidate_pattern.finditer("\n".join(chunk))
+        }
+        for (i, title) in enumerate(chunk):
+            yield title, get_title_time(title) if i in candidates else False
@@ -1,21 +1,427 @@
 # Standard Library
+import codecs
+import io
+import json
 import re
+import sqlite3
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
 
 # Third party
+import requests
 from furl import furl
+from requests.adapters import HTTPAdapter
+
+# YouTubeTimestampRedditBot
+from src.utils.cache import TTLCache
+
+# scheme, host, path, query and fragment in one pass. any subdomain of youtube.com is accepted.
+# base is everything before the query, so new urls can be built without re-parsing.
+youtube_url_regex = re.compile(
+    r"(?P<base>(?:(?:https?:)?//)?"
+    r"(?:[\w-]+\.)*(?P<domain>youtube\.com|youtu\.be)(?::\d+)?(?=[/?#]|$)"
+    r"(?P<path>/[^?#]*)?)"
+    r"(?:\?(?P<query>[^#]*))?"
+    r"(?:#(?P<fragment>.*))?",
+    re.IGNORECASE,
+)
+# youtube.com paths which have the video id as the second segment
+video_id_paths = {"shorts", "live", "embed", "v"}
+timestamp_params = {"t", "start"}
+
+HOST_SHORT = "youtu.be"
+
+T = TypeVar("T")
+
+# where length and title are in the watch page's player response
+video_details_marker = '"videoDetails":'
+# title is a json string, which may contain escaped quotes
+video_title_regex = re.compile(r'"title":"((?:[^"\\]|\\.)*)"')
+length_seconds_regex = re.compile(r'"lengthSeconds":"(\d+)"')
+
+
+class YouTubeMetadata(NamedTuple):
+    length: int
+    title: str
+
+
+class YouTubeUrl:
+    """
+    compact result of parse_youtube_url.
+    """
+
+    __slots__ = (
+        "host_kind",
+        "path_kind",
+        "video_id",
+        "timestamp",
+        "base",
+        "query",
+        "fragment",
+    )
+
+    def __init__(
+        self,
+        host_kind: str,
+        path_kind: str,
+        video_id: Optional[str],
+        timestamp: Optional[str],
+        base: str,
+        query: str,
+        fragment: Optional[str],
+    ):
+        self.host_kind = host_kind
+        self.path_kind = path_kind
+        self.video_id = video_id
+        self.timestamp = timestamp
+        self.base = base
+        self.query = query
+        self.fragment = fragment
+
+    def with_timestamp(self, timestamp: str) -> str:
+        # the shorts player ignores t, so link to the regular watch page instead
+        if self.path_kind == "shorts" and self.video_id:
+            return f"https://www.youtube.com/watch?v={self.video_id}&t={timestamp}"
+        query = f"{self.query}&t={timestamp}" if self.query else f"t={timestamp}"
+        fragment = f"#{self.fragment}" if self.fragment is not None else ""
+        return f"{self.base}?{query}{fragment}"
+
+
+def parse_youtube_url(url: str) -> Optional[YouTubeUrl]:
+    """
+    e.g. arg: https://m.youtube.com/watch?v=bG4gZ8hXS0M&feature=share#t=1m
+    returns:  YouTubeUrl with host_kind youtube.com, path_kind watch,
+              video_id bG4gZ8hXS0M, timestamp 1m
+    returns None for urls which aren't youtube urls.
+    """
+    match = youtube_url_regex.match(url)
+    if not match:
+        return None
+    host_kind = match.group("domain").lower()
+    segments = (match.group("path") or "").strip("/").split("/")
+    query = match.group("query") or ""
+    fragment = match.group("fragment")
+
+    video_id = None
+    timestamp = None
+    for param in query.split("&") if query else []:
+        key, _, value = param.partition("=")
+        if key in timestamp_params:
+            timestamp = value
+        elif key == "v":
+            video_id = value
+    # e.g. #t=1m
+    if fragment and fragment.startswith("t="):
+        timestamp = fragment[2:]
+
+    path_kind = segments[0]
+    if host_kind == HOST_SHORT:
+        path_kind = ""
+        video_id = segments[0] or None
+    elif path_kind in video_id_paths and len(segments) > 1:
+        video_id = segments[1]
+    return YouTubeUrl(
+        host_kind=host_kind,
+        path_kind=path_kind,
+        video_id=video_id or None,
+        timestamp=timestamp,
+        base=match.group("base"),
+        query=query,
+        fragment=fragment,
+    )
 
 
 def is_youtube_url_without_timestamp(url: str) -> bool:
-    # is the url a youtube url https://regexr.com/3dj5t
-    yt_regex = r"((?:https?:)?\/\/)?((?:www|m)\.)?((?:youtube\.com|youtu.be))"
-    if not re.search(yt_regex, url):
-        return False
-    # if ?t= or &t= is in the url, it already has a timestamp
-    if any(t in url for t in ["?t=", "&t="]):
-        return False
-    return True
+    parsed = parse_youtube_url(url)
+    return parsed is not None and parsed.timestamp is None
 
 
 def add_timestamp_to_youtube_url(url: str, timestamp: str) -> str:
-    # https://stackoverflow.com/a/24791840/6305204
-    return furl(url).add({"t": timestamp}).url
+    parsed = parse_youtube_url(url)
+    if parsed is None:
+        # https://stackoverflow.com/a/24791840/6305204
+        return furl(url).add({"t": timestamp}).url
+    return parsed.with_timestamp(timestamp)
+
+
+def get_video_id(url: str) -> Optional[str]:
+    """
+    e.g. arg: https://youtu.be/bG4gZ8hXS0M?feature=share
+    returns:  bG4gZ8hXS0M
+    """
+    parsed = parse_youtube_url(url)
+    return parsed.video_id if parsed else None
+
+
+class YouTubeDeadlineExceeded(requests.exceptions.Timeout):
+    pass
+
+
+class PytubeResponse:
+    """the parts of urllib's response which pytube reads"""
+
+    def __init__(self, response: requests.Response, body: bytes):
+        self.status = response.status_code
+        self.headers = response.headers
+        self.body = io.BytesIO(body)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self.body.read(amt)
+
+    def info(self) -> Any:
+        return self.headers
+
+
+class YouTubeSession:
+    """
+    keep-alive connections to youtube, shared by every fetch, so bursts of candidates don't
+    each pay for a new connection and tls handshake. pool_size is how many can be open at once,
+    e.g. one per batch worker. each request has to finish within deadline seconds:
+    connect and each read are limited by the timeouts, and the whole body by the deadline,
+    which is checked between chunks.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 8,
+        connect_timeout: float = 3,
+        read_timeout: float = 5,
+        deadline: float = 10,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.session = requests.Session()
+        # pytube's defaults, youtube serves a consent page without accept-language
+        self.session.headers.update(
+            {"User-Agent": "Mozilla/5.0", "accept-language": "en-US,en"}
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def iter_content(
+        self, response: requests.Response, deadline: float, chunk_size: int
+    ) -> Iterator[bytes]:
+        for chunk in response.iter_content(chunk_size):
+            if time.monotonic() > deadline:
+                raise YouTubeDeadlineExceeded(
+                    f"{response.url} took longer than {self.deadline} seconds"
+                )
+            yield chunk
+
+    def request(self, method: str, url: str, **kwargs) -> PytubeResponse:
+        """make a request and read the whole body, raising for error statuses"""
+        deadline = time.monotonic() + self.deadline
+        with self.session.request(
+            method,
+            url,
+            timeout=(self.connect_timeout, self.read_timeout),
+            stream=True,
+            **kwargs,
+        ) as response:
+            response.raise_for_status()
+            body = b"".join(self.iter_content(response, deadline, 64 * 1024))
+            return PytubeResponse(response, body)
+
+    def scan_text(
+        self,
+        url: str,
+        scan: Callable[[Iterable[str]], T],
+        chunk_size: int = 16 * 1024,
+    ) -> T:
+        """
+        GET url and return what scan returns, passing it the body as text as it arrives.
+        the rest of the body is read without decoding once scan returns, so the connection
+        goes back to the pool. if that takes past the deadline the connection is dropped,
+        scan's result is still returned.
+        """
+        deadline = time.monotonic() + self.deadline
+        with self.session.get(
+            url, timeout=(self.connect_timeout, self.read_timeout), stream=True
+        ) as response:
+            response.raise_for_status()
+            # youtube pages are utf-8, requests guesses latin-1 for text without a charset
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            chunks = self.iter_content(response, deadline, chunk_size)
+            result = scan(decoder.decode(chunk) for chunk in chunks)
+            try:
+                for _ in chunks:
+                    pass
+            except YouTubeDeadlineExceeded:
+                pass
+            return result
+
+    def execute_request(
+        self,
+        url: str,
+        method: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        data: Any = None,
+        timeout: Any = None,
+    ) -> PytubeResponse:
+        """same arguments as pytube.request._execute_request, which uses a new connection each time"""
+        if data is not None and not isinstance(data, bytes):
+            data = json.dumps(data).encode("utf-8")
+        # like urllib, requests with data are posts
+        method = method or ("GET" if data is None else "POST")
+        return self.request(method, url, headers=headers, data=data)
+
+
+def use_youtube_session(session: YouTubeSession):
+    """
+    route every request pytube makes through session.
+    pytube has no way to pass a session in, and calls this for all its requests.
+    """
+    # Third party
+    from pytube import request as pytube_request
+
+    pytube_request._execute_request = session.execute_request  # type: ignore
+
+
+default_session = YouTubeSession()
+
+
+def scan_video_details(chunks: Iterable[str]) -> Optional[YouTubeMetadata]:
+    """
+    length and title from the videoDetails in a watch page, reading chunks only until both
+    are found. returns None if the page doesn't have them, e.g. youtube changed the page.
+    """
+    buffer = ""
+    found_marker = False
+    for chunk in chunks:
+        buffer += chunk
+        if not found_marker:
+            start = buffer.find(video_details_marker)
+            if start < 0:
+                # only keep enough to find a marker split across chunks
+                buffer = buffer[-len(video_details_marker) :]
+                continue
+            found_marker = True
+            buffer = buffer[start:]
+        title = video_title_regex.search(buffer)
+        length_seconds = length_seconds_regex.search(buffer)
+        if title and length_seconds:
+            return YouTubeMetadata(
+                length=int(length_seconds.group(1)),
+                title=json.loads(f'"{title.group(1)}"'),
+            )
+    return None
+
+
+def fetch_with_pytube(url: str, session: YouTubeSession) -> YouTubeMetadata:
+    # imported here, so it's only loaded by processes which need it
+    # Third party
+    from pytube import YouTube
+
+    use_youtube_session(session)
+    yt = YouTube(url)
+    return YouTubeMetadata(length=yt.length, title=yt.title)
+
+
+def fetch_youtube_metadata(
+    url: str, session: Optional[YouTubeSession] = None
+) -> YouTubeMetadata:
+    """
+    scan the watch page for length and title, decoding and searching it only until both are
+    found (the rest is read and discarded, to keep the connection). pytube parses much more of the page and the player response, so it's only used if the
+    scan doesn't find them. request errors are raised rather than trying pytube as well.
+    """
+    session = session or default_session
+    video_id = get_video_id(url)
+    if video_id is not None:
+        metadata = session.scan_text(
+            f"https://www.youtube.com/watch?v={video_id}", scan_video_details
+        )
+        if metadata is not None:
+            return metadata
+    return fetch_with_pytube(url, session)
+
+
+class YouTubeMetadataCache:
+    """
+    cache youtube length and title by video id, so the same video posted to many subreddits
+    (or with different urls like youtu.be, m.youtube.com, &feature=share) is only fetched once.
+    entries are kept in memory, and optionally in sqlite so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: float = 24 * 60 * 60,
+        db_path: str = "",
+        fetch: Callable[[str], YouTubeMetadata] = fetch_youtube_metadata,
+    ):
+        self.ttl = ttl
+        self.fetch = fetch
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.db: Optional[sqlite3.Connection] = None
+        self.db_lock = threading.Lock()
+        if db_path:
+            # may be read from executor / worker threads, access is serialised by db_lock
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                """CREATE TABLE IF NOT EXISTS youtube_metadata (
+                    video_id TEXT PRIMARY KEY,
+                    length INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )"""
+            )
+            self.db.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stats_lock = threading.Lock()
+
+    def read_from_db(self, video_id: str) -> Optional[YouTubeMetadata]:
+        if self.db is None:
+            return None
+        with self.db_lock:
+            row = self.db.execute(
+                "SELECT length, title FROM youtube_metadata WHERE video_id = ? AND fetched_at > ?",
+                (video_id, time.time() - self.ttl),
+            ).fetchone()
+        return YouTubeMetadata(*row) if row else None
+
+    def write_to_db(self, video_id: str, metadata: YouTubeMetadata):
+        if self.db is None:
+            return
+        with self.db_lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO youtube_metadata VALUES (?, ?, ?, ?)",
+                (video_id, metadata.length, metadata.title, time.time()),
+            )
+            self.db.commit()
+
+    def count(self, stat: str):
+        with self.stats_lock:
+            setattr(self, stat, getattr(self, stat) + 1)
+
+    def get(self, url: str) -> YouTubeMetadata:
+        # fall back to the url itself if there's no recognisable video id
+        key = get_video_id(url) or url
+        found, metadata = self.memory.lookup(key)
+        if found:
+            self.count("hits")
+            return metadata
+        metadata = self.read_from_db(key)
+        if metadata:
+            self.count("disk_hits")
+            self.memory.set(key, metadata)
+            return metadata
+        self.count("misses")
+        metadata = self.fetch(url)
+        self.memory.set(key, metadata)
+        self.write_to_db(key, metadata)
+        return metadata
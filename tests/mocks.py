@@ -1,5 +1,12 @@
 # Standard Library
-from typing import List
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, cast
+from unittest.mock import patch
+
+# Third party
+from freezegun import freeze_time
+from freezegun.api import FrozenDateTimeFactory
 
 
 class Struct:
@@ -20,23 +27,60 @@ class MockSubmission:
         url: str,
         subreddit_display_name: str = "foo",
         user_is_banned: bool = False,
+        score: int = 1,
+        created_utc: Optional[float] = None,
     ):
         self.id = "test_submission"
         self.title = title
         self.url = url
         self.subreddit = MockSubreddit(subreddit_display_name, user_is_banned)
         self.permalink = "test_permalink"
+        self.score = score
+        self.created_utc = time.time() if created_utc is None else created_utc
 
     def reply(*args):
         return args
 
 
+class MockCommentForest(list):
+    def replace_more(self, limit=32):
+        return []
+
+
 class MockComment:
-    def __init__(self, body: str, score: int = 0, replies: List = []):
+    def __init__(
+        self,
+        body: str,
+        score: int = 0,
+        replies: List = [],
+        created_utc: Optional[float] = None,
+    ):
         self.id = "test_comment"
         self.body = body
         self.score = score
         self.replies = replies
+        self.created_utc = time.time() if created_utc is None else created_utc
+
+    def refresh(self):
+        return self
 
     def delete(self):
         return True
+
+
+@contextmanager
+def frozen_clock(jitter: Optional[float] = None) -> Iterator[FrozenDateTimeFactory]:
+    """
+    freeze time, sleeping moves it on instead of waiting.
+    if jitter is set random.random returns it, e.g. 1.0 so back-off is always the longest wait.
+    """
+    with freeze_time("2020-01-01 12:00") as frozen_time, patch(
+        "time.sleep", side_effect=frozen_time.tick
+    ):
+        # without tick=True freeze_time always gives a FrozenDateTimeFactory
+        frozen_time = cast(FrozenDateTimeFactory, frozen_time)
+        if jitter is None:
+            yield frozen_time
+        else:
+            with patch("random.random", return_value=jitter):
+                yield frozen_time
@@ -0,0 +1,81 @@
+# Standard Library
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+# YouTubeTimestampRedditBot
+from src.async_engine import AsyncEngine
+from src.bot import Bot
+from src.utils.youtube import YouTubeMetadata
+from tests.mocks import MockSubmission
+
+
+def create_bot(submissions):
+    bot = Bot(comment_wait_time=10, check_bad_comment_wait_time=10)
+    bot.r = MagicMock()
+    # the stream skips ids which have already been processed
+    for (i, submission) in enumerate(s for s in submissions if s is not None):
+        submission.id = str(i)
+    bot.r.subreddit.return_value.stream.submissions.return_value = iter(submissions)
+    bot.already_commented = MagicMock(return_value=False)
+    bot.comment_on_submission = MagicMock(return_value="commented")
+    return bot
+
+
+class TestAsyncEngine(unittest.TestCase):
+    def test_stream_not_blocked_by_comment_sleep(self):
+        """
+        after commenting the bot waits 10 minutes before commenting again,
+        but the rest of the stream should still be evaluated.
+        """
+        submissions = [
+            MockSubmission(f"Cool thing at 12:3{i}", "https://foo.com")
+            for i in range(5)
+        ]
+        bot = create_bot(submissions)
+        bot.evaluate_submission = MagicMock(return_value=("comment", ""))
+        bot.comment_outbox.max_size = 2
+        engine = AsyncEngine(bot)
+        asyncio.run(asyncio.wait_for(engine.run(), timeout=5))
+        assert engine.evaluated == 5
+        assert engine.commented == 1
+        assert bot.comment_outbox.dropped_full + len(bot.comment_outbox) == 4
+
+    def test_errors_are_raised(self):
+        bot = create_bot([MockSubmission("at 1:00", "https://foo.com")])
+        bot.evaluate_submission = MagicMock(side_effect=ConnectionError("down"))
+        with self.assertRaises(ConnectionError):
+            asyncio.run(asyncio.wait_for(AsyncEngine(bot).run(), timeout=5))
+
+    def test_praw_calls_run_on_one_thread(self):
+        """
+        praw isn't thread safe, so everything which can use bot.r runs on the same thread.
+        youtube fetches run elsewhere, and None from the stream (no new submissions) is skipped.
+        """
+        praw_threads = set()
+        fetch_threads = set()
+
+        def record_praw_thread(*args):
+            praw_threads.add(threading.current_thread().name)
+            return False
+
+        def fetch(url):
+            fetch_threads.add(threading.current_thread().name)
+            return YouTubeMetadata(length=600, title="")
+
+        submissions = [
+            MockSubmission(f"Cool thing at 1:0{i}", f"https://youtu.be/video{i}")
+            for i in range(3)
+        ]
+        bot = create_bot([submissions[0], None, *submissions[1:]])
+        bot.youtube_cache.fetch = fetch
+        bot.already_commented = MagicMock(side_effect=record_praw_thread)
+        bot.comment_on_submission = MagicMock(side_effect=record_praw_thread)
+        engine = AsyncEngine(bot, stream_poll_interval=0)
+        asyncio.run(asyncio.wait_for(engine.run(), timeout=5))
+        assert engine.evaluated == 3
+        assert engine.commented == 1
+        assert len(praw_threads) == 1
+        assert praw_threads.pop().startswith("praw")
+        assert fetch_threads and not any(t.startswith("praw") for t in fetch_threads)
@@ -1,14 +1,27 @@
 # Standard Library
+import random
+import threading
+import time
 import unittest
 from datetime import datetime
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 
 # Third party
 from freezegun import freeze_time
+from prawcore.exceptions import ServerError
+from requests.exceptions import ConnectionError
 
 # YouTubeTimestampRedditBot
 from src.bot import Bot
-from tests.mocks import MockComment
+from src.utils.youtube import YouTubeDeadlineExceeded, YouTubeMetadata
+from tests.mocks import (
+    MockComment,
+    MockCommentForest,
+    MockSubmission,
+    MockSubreddit,
+    Struct,
+    frozen_clock,
+)
 
 
 class TestBot(unittest.TestCase):
@@ -47,32 +60,335 @@ version 2.4.7
                 actual = Bot().should_delete_comment(d["comment"])
                 assert actual == d["expected_output"]
 
-    @patch("time.sleep")
-    def test_handle_comment_sleep(self, patched_time_sleep):
+    def test_delete_bad_comments_replies_fetched_when_due(self):
+        """
+        scores are checked every sweep, replies only when the sweeper says they're due
+        """
+        bot = Bot(check_bad_comment_wait_time=10)
+        bot.r = MagicMock()
+        replies = PropertyMock(return_value=[MockComment("good bot")])
+        comment = MockComment("test body", score=1)
+        # subclass so the PropertyMock doesn't leak into other tests
+        comment.__class__ = type(
+            "CountingComment", (MockComment,), {"replies": replies}
+        )
+        bot.r.user.me.return_value.comments.new.return_value = [comment]
+        with freeze_time("2020-01-01 12:00") as frozen_time:
+            comment.created_utc = time.time()
+            bot.delete_bad_comments()
+            frozen_time.tick(5 * 60)
+            bot.delete_bad_comments()
+            assert replies.call_count == 1
+            frozen_time.tick(5 * 60)
+            bot.delete_bad_comments()
+            assert replies.call_count == 2
+            comment.score = 0
+            bot.delete_bad_comments()
+        assert replies.call_count == 2
+        assert bot.r.redditor.return_value.message.call_count == 1
+
+    def test_delete_comments_with_bad_replies(self):
+        """
+        inbox mode deletes the comment a "bad bot" reply is to, without polling replies,
+        and only reads the inbox back to the newest reply it has already seen
+        """
+
+        def create_reply(body, parent_id="t1_a", created_utc=10, new=True):
+            return Struct(
+                name=f"t1_reply{created_utc}",
+                new=new,
+                created_utc=created_utc,
+                body=body,
+                parent_id=parent_id,
+                context="test_context",
+            )
+
+        replies = [
+            create_reply("Bad Bot", created_utc=13),
+            create_reply("bad bot!", created_utc=12),
+            create_reply("good bot", "t1_b", created_utc=11),
+            # read before a restart
+            create_reply("bad bot", "t1_c", created_utc=10, new=False),
+        ]
+        bot = Bot(bad_bot_detection="inbox")
+        bot.r = MagicMock()
+        bot.r.inbox.comment_replies.return_value = replies
+        bot.r.user.me.return_value.comments.new.return_value = []
+        bot.delete_bad_comments()
+        bot.r.inbox.comment_replies.assert_called_once_with(limit=100)
+        bot.r.comment.assert_called_once_with("a")
+        assert bot.r.comment.return_value.delete.call_count == 1
+        bot.r.inbox.mark_read.assert_called_once_with(replies[:3])
+
+        # the next check stops at the newest reply from the last one
+        bot.r.reset_mock()
+        new_reply = create_reply("bad bot", "t1_d", created_utc=14)
+        bot.r.inbox.comment_replies.return_value = iter([new_reply, *replies])
+        bot.delete_bad_comments()
+        bot.r.inbox.comment_replies.assert_called_once_with(limit=None)
+        bot.r.comment.assert_called_once_with("d")
+        bot.r.inbox.mark_read.assert_called_once_with([new_reply])
+        assert bot.newest_reply_name == "t1_reply14"
+        # replies aren't polled in inbox mode
+        comment = MockComment("test body", 1, [MockComment("bad bot")])
+        assert bot.should_delete_comment(comment) == ""
+
+    def test_parse_submission_rejects_before_network_checks(self):
+        """
+        cheap checks should reject submissions before karma or ban status is fetched
+        """
+        submissions = [
+            {
+                "submission": MockSubmission("at 1:00", "https://foo.com"),
+                "expected_output": (False, ""),
+                "expected_stage": "youtube_url",
+            },
+            {
+                "submission": MockSubmission(
+                    "no timestamp", "https://youtu.be/foo", "superstonk", True
+                ),
+                "expected_output": (False, "no timestamp in reddit title"),
+                "expected_stage": "title_timestamp",
+            },
+        ]
+        for (i, d) in enumerate(submissions):
+            with self.subTest(i=i):
+                bot = Bot()
+                bot.r = MagicMock()
+                assert bot.parse_submission(d["submission"]) == d["expected_output"]
+                assert not bot.r.redditor.called
+                assert bot.filter_rejections == {d["expected_stage"]: 1}
+
+    def test_parse_submission_karma_only_fetched_when_required(self):
+        bot = Bot()
+        bot.r = MagicMock()
+        bot.r.redditor.return_value.comment_karma = 10
+        submission = MockSubmission(
+            "at 1:00", "https://youtu.be/foo", "superstonk", False
+        )
+        assert bot.parse_submission(submission) == (
+            False,
+            "need 1200 karma to post in superstonk, only have 10",
+        )
+        assert bot.r.redditor.called
+        bot.r.reset_mock()
+        submission = MockSubmission("at 1:00", "https://youtu.be/foo", "foo", True)
+        assert bot.parse_submission(submission) == (False, "user is banned")
+        assert not bot.r.redditor.called
+        assert bot.filter_rejections == {"karma": 1, "banned": 1}
+
+    def test_get_comment_karma_cached(self):
+        """
+        karma should only be fetched again once karma_cache_ttl has passed
+        """
+        bot = Bot(karma_cache_ttl=60)
+        bot.r = MagicMock()
+        bot.r.redditor.return_value.comment_karma = 10
+        with freeze_time("2020-01-01 12:00"):
+            assert bot.get_comment_karma() == 10
+        bot.r.redditor.return_value.comment_karma = 20
+        with freeze_time("2020-01-01 12:59"):
+            assert bot.get_comment_karma() == 10
+        with freeze_time("2020-01-01 13:00"):
+            assert bot.get_comment_karma() == 20
+        assert bot.r.redditor.call_count == 2
+
+    def test_get_comment_karma_invalidated(self):
+        bot = Bot(karma_cache_ttl=60)
+        bot.r = MagicMock()
+        bot.r.redditor.return_value.comment_karma = 10
+        with freeze_time("2020-01-01 12:00"):
+            assert bot.get_comment_karma() == 10
+            bot.r.redditor.return_value.comment_karma = 20
+            bot.r.user.me.return_value.comments.new.return_value = [
+                MockComment("good comment", score=5)
+            ]
+            # nothing deleted, cached karma is still valid
+            bot.delete_bad_comments()
+            assert bot.get_comment_karma() == 10
+            bot.r.user.me.return_value.comments.new.return_value = [
+                MockComment("bad comment", score=-1)
+            ]
+            bot.delete_bad_comments()
+            assert bot.get_comment_karma() == 20
+
+    def test_karma_rejection_rechecked_after_invalidation(self):
+        """
+        karma rejections aren't cached per subreddit, so new karma is used once invalidated
+        """
+        bot = Bot(karma_cache_ttl=60)
+        bot.r = MagicMock()
+        bot.r.redditor.return_value.comment_karma = 10
+        submission = MockSubmission("at 1:00", "https://youtu.be/foo", "superstonk")
+        with freeze_time("2020-01-01 12:00"):
+            assert bot.filter_karma(submission, {}) == (
+                "need 1200 karma to post in superstonk, only have 10"
+            )
+            bot.r.redditor.return_value.comment_karma = 1200
+            bot.invalidate_comment_karma()
+            assert bot.filter_karma(submission, {}) is None
+
+    def test_metrics(self):
+        """
+        stages are only timed when metrics are enabled
+        """
+        assert Bot().metrics is None
+        bot = Bot(metrics_log_interval=10)
+        bot.r = MagicMock()
+        submission = MockSubmission("at 1:00", "https://youtu.be/foo", "foo", True)
+        assert bot.parse_submission(submission) == (False, "user is banned")
+        timers = bot.metrics.timers["stage"]
+        assert [labels[0][1] for labels in timers] == [
+            "youtube_url",
+            "blacklist",
+            "title_timestamp",
+            "karma",
+            "banned",
+        ]
+        assert bot.metrics.counters["filter_rejections"] == {(("stage", "banned"),): 1}
+        assert "ytbot_comment_outbox_depth 0" in bot.metrics.render()
+
+    def test_subreddit_ban_status_cached(self):
+        """
+        ban status should only be fetched once per subreddit, including negative results
+        """
+        bot = Bot()
+        bot.r = MagicMock()
+        submission = MockSubmission("no timestamp", "https://youtu.be/foo", "Foo")
+        user_is_banned = PropertyMock(return_value=False)
+        # subclass so the PropertyMock doesn't leak into other tests
+        submission.subreddit.__class__ = type(
+            "CountingSubreddit",
+            (MockSubreddit,),
+            {"user_is_banned": user_is_banned},
+        )
+        for _ in range(3):
+            assert bot.filter_banned(submission, {}) is None
+        assert user_is_banned.call_count == 1
+        assert bot.get_subreddit_info("foo") == {"banned": False}
+
+    def test_already_commented(self):
+        bot = Bot()
+        dicts = [
+            {"authors": [None, "foo"], "expected_output": False},
+            {"authors": [None, "YouTubeTimestampBot"], "expected_output": True},
+        ]
+        for (i, d) in enumerate(dicts):
+            with self.subTest(i=i):
+                submission = MockSubmission("at 1:00", "https://youtu.be/foo")
+                submission.id = f"id_{i}"
+                submission.comments = MockCommentForest(
+                    [
+                        Struct(author=Struct(name=name) if name else None)
+                        for name in d["authors"]
+                    ]
+                )
+                assert bot.already_commented(submission) == d["expected_output"]
+                assert (submission.id in bot.commented_index) == d["expected_output"]
+
+    def test_already_commented_uses_index(self):
+        """
+        comments shouldn't be loaded if the submission is already in the index
+        """
+        bot = Bot()
+        bot.commented_index.add("test_submission")
+        submission = MagicMock(id="test_submission")
+        assert bot.already_commented(submission)
+        assert not submission.comments.replace_more.called
+
+    def test_handle_comment_outbox(self):
         """
         bot commented at 12:00 and found another post to comment on at 12:01.
-        should sleep for 9 minutes.
+        should queue it and comment at 12:10 without sleeping.
         """
         bot = Bot(comment_wait_time=10)
+        bot.already_commented = MagicMock(return_value=False)
+        bot.comment_on_submission = MagicMock(return_value="commented")
         with freeze_time("2020-01-01 12:00"):
             bot.last_commented = datetime.now()
         with freeze_time("2020-01-01 12:01"):
-            bot.handle_comment_sleep()
-        # sleep for 9 minutes
-        patched_time_sleep.assert_called_with(9 * 60)
+            submission = MockSubmission("at 1:00", "https://youtu.be/foo")
+            bot.comment_outbox.push(submission, "comment")
+            bot.handle_comment_outbox()
+            assert not bot.comment_on_submission.called
+            assert len(bot.comment_outbox) == 1
+        with freeze_time("2020-01-01 12:10"):
+            bot.handle_comment_outbox()
+            bot.comment_on_submission.assert_called_with(submission, "comment")
+            assert bot.last_commented == datetime.now()
+        assert len(bot.comment_outbox) == 0
 
-    @patch("time.sleep")
-    def test_handle_comment_no_sleep(self, patched_time_sleep):
+    def test_handle_comment_outbox_first_comment(self):
         """
-        bot should not sleep if the last comment was longer ago than comment_wait_time
+        bot should comment straight away if it hasn't commented yet
         """
         bot = Bot(comment_wait_time=10)
-        with freeze_time("2020-01-01 12:00"):
-            bot.last_commented = datetime.now()
-        with freeze_time("2020-01-01 12:10"):
-            bot.handle_comment_sleep()
-        # should not sleep at all since last comment was 10 minutes ago
-        assert not patched_time_sleep.called
+        bot.already_commented = MagicMock(return_value=False)
+        bot.comment_on_submission = MagicMock(return_value="commented")
+        bot.comment_outbox.push(MockSubmission("at 1:00", "https://youtu.be/foo"), "c")
+        bot.handle_comment_outbox()
+        assert bot.comment_on_submission.called
+
+    def test_batch_rising_submissions(self):
+        """
+        only youtube fetches run in worker threads. praw is only used from the main thread,
+        and submissions are logged and commented on in order,
+        waiting comment_wait_time between comments
+        """
+        main_thread = threading.get_ident()
+        praw_threads = set()
+        fetch_threads = set()
+
+        class ThreadRecordingSubreddit(MockSubreddit):
+            @property
+            def user_is_banned(self):
+                praw_threads.add(threading.get_ident())
+                return False
+
+            @user_is_banned.setter
+            def user_is_banned(self, value):
+                pass
+
+        submissions = []
+        for i in range(20):
+            # only every 5th submission has a timestamp in the title
+            title = f"title {i} at 1:{i:02d}" if i % 5 == 0 else f"title {i}"
+            submission = MockSubmission(title, f"https://youtu.be/video{i}")
+            submission.id = str(i)
+            submission.subreddit.__class__ = ThreadRecordingSubreddit
+            submission.comments = MockCommentForest()
+            submissions.append(submission)
+
+        def fetch(url):
+            fetch_threads.add(threading.get_ident())
+            # finish out of order
+            real_sleep(random.random() / 100)
+            return YouTubeMetadata(length=600, title=url)
+
+        bot = Bot(comment_wait_time=10, batch_workers=4)
+        bot.login = MagicMock()
+        bot.r = MagicMock()
+        bot.r.subreddit.return_value.rising.return_value = iter(submissions)
+        bot.youtube_cache.fetch = fetch
+        bot.log_submission = MagicMock()
+        bot.comment_on_submission = MagicMock(return_value="commented")
+        bot.handle_delete_bad_comments = MagicMock()
+        real_sleep = time.sleep
+        with frozen_clock():
+            started = time.time()
+            bot.batch_rising_submissions()
+            # every comment after the first has to wait for comment_wait_time
+            assert time.time() - started == 3 * 10 * 60
+        logged = [call.args[0].id for call in bot.log_submission.call_args_list]
+        assert logged == [str(i) for i in range(20)]
+        commented = [
+            call.args[0].id for call in bot.comment_on_submission.call_args_list
+        ]
+        assert sorted(commented) == ["0", "10", "15", "5"]
+        # only submissions which passed the local stages were fetched, each once
+        assert bot.youtube_cache.misses == 4
+        assert fetch_threads and main_thread not in fetch_threads
+        assert praw_threads == {main_thread}
 
     def test_handle_delete_bad_comments(self):
         """
@@ -97,3 +413,136 @@ version 2.4.7
         with freeze_time("2020-01-01 12:09"):
             bot.handle_delete_bad_comments()
         assert not bot.delete_bad_comments.called
+
+    def test_submission_stream_resumes_from_checkpoint(self):
+        """
+        submissions posted since the checkpoint are backfilled oldest first, then the stream
+        continues without repeating anything processed or backfilled
+        """
+        submissions = []
+        for i in range(6):
+            submission = MockSubmission(f"at 1:{i:02d}", "https://foo.com")
+            submission.id = str(i)
+            submission.created_utc = i
+            submissions.append(submission)
+        bot = Bot()
+        bot.r = MagicMock()
+        bot.checkpoint.mark(submissions[1])
+        bot.checkpoint.mark(submissions[2])
+        subreddit = bot.r.subreddit.return_value
+        subreddit.new.return_value = iter(reversed(submissions[:5]))
+        subreddit.stream.submissions.return_value = iter(
+            [submissions[2], submissions[3], submissions[4], None, submissions[5]]
+        )
+        streamed = list(bot.submission_stream(pause_after=-1))
+        assert [s and s.id for s in streamed] == ["3", "4", None, "5"]
+        # listing stopped at the first submission older than the checkpoint
+        assert next(subreddit.new.return_value).id == "0"
+
+    def test_stream_new_submissions_saves_checkpoint(self):
+        """
+        the checkpoint is saved when the stream stops, not only every save_interval
+        """
+        submission = MockSubmission("at 1:00", "https://foo.com")
+        submission.id = "a"
+        bot = Bot()
+        bot.login = MagicMock()
+        bot.handle_submission = MagicMock()
+        bot.checkpoint.flush = MagicMock()
+
+        def submission_stream():
+            yield submission
+            raise ServerError(MagicMock())
+
+        bot.submission_stream = submission_stream
+        with self.assertRaises(ServerError):
+            bot.stream_new_submissions()
+        assert "a" in bot.checkpoint
+        bot.checkpoint.flush.assert_called_once()
+
+    def test_hydrate_subreddit_info(self):
+        """
+        ban status is fetched in bulk, only for subreddits of submissions which pass the
+        local stages and aren't cached
+        """
+        submissions = [
+            MockSubmission("at 1:00", "https://youtu.be/a", "Foo"),
+            MockSubmission("at 1:00", "https://youtu.be/b", "bar"),
+            MockSubmission("at 1:00", "https://youtu.be/c", "cached"),
+            MockSubmission("no timestamp", "https://youtu.be/d", "skipped"),
+        ]
+        bot = Bot()
+        bot.r = MagicMock()
+        bot.r.info.return_value = [
+            Struct(display_name="Foo", user_is_banned=True),
+            # user_is_banned not loaded, left for filter_banned
+            Struct(display_name="bar"),
+        ]
+        bot.get_subreddit_info("cached")["banned"] = False
+        bot.hydrate_subreddit_info(submissions)
+        bot.r.info.assert_called_once_with(subreddits=["foo", "bar"])
+        assert bot.get_subreddit_info("foo") == {"banned": True}
+        assert bot.get_subreddit_info("bar") == {}
+        assert "skipped" not in bot.subreddit_cache
+
+    def test_parse_specific_submissions(self):
+        """
+        submissions are fetched together, and subreddits are hydrated before they're parsed
+        """
+        submissions = [
+            MockSubmission("at 1:00", "https://youtu.be/a", "foo"),
+            MockSubmission("at 1:00", "https://youtu.be/b", "bar"),
+        ]
+        submissions[0].id = "abc"
+        submissions[1].id = "other"
+        bot = Bot()
+        bot.login = MagicMock()
+        bot.r = MagicMock()
+        bot.r.info.side_effect = lambda fullnames=None, subreddits=None: (
+            [Struct(fullname=f"t3_{s.id}", **vars(s)) for s in submissions]
+            if fullnames
+            else [Struct(display_name=name, user_is_banned=True) for name in subreddits]
+        )
+        bot.parse_specific_submissions(
+            [
+                "https://www.reddit.com/r/foo/comments/abc/title/",
+                "https://www.reddit.com/r/bar/comments/other/title/",
+            ]
+        )
+        assert bot.r.info.call_args_list[0].kwargs == {
+            "fullnames": ["t3_abc", "t3_other"]
+        }
+        assert bot.r.info.call_count == 2
+        assert bot.filter_rejections == {"banned": 2}
+
+    def test_main_retries(self):
+        """
+        connection errors are retried with back-off, until connection_retry_limit in a row
+        """
+        bot = Bot(connection_retry_limit=3, connection_retry_wait_time=1)
+        bot.stream_new_submissions = MagicMock(
+            side_effect=[ConnectionError(), ServerError(MagicMock()), None]
+        )
+        # no jitter, always the longest wait
+        with patch("time.sleep") as patched_sleep, patch(
+            "random.random", return_value=1.0
+        ):
+            bot.main()
+        assert [call.args[0] for call in patched_sleep.call_args_list] == [60, 60]
+        bot.stream_new_submissions = MagicMock(side_effect=ConnectionError())
+        with patch("time.sleep"):
+            with self.assertRaises(ConnectionError):
+                bot.main()
+
+    def test_youtube_fetch_failure_rejects(self):
+        """
+        a youtube request which fails or takes too long skips the submission, the stream goes on
+        """
+        bot = Bot()
+        bot.youtube_cache.fetch = MagicMock(side_effect=YouTubeDeadlineExceeded("slow"))
+        comment, msg = bot.evaluate_submission(
+            MockSubmission("at 1:00", "https://youtu.be/foo")
+        )
+        assert comment is None
+        assert msg == "failed to fetch youtube metadata: slow"
+        assert bot.filter_rejections == {"youtube_metadata": 1}
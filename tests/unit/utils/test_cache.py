@@ -0,0 +1,49 @@
+# Standard Library
+import unittest
+
+# Third party
+from freezegun import freeze_time
+
+# YouTubeTimestampRedditBot
+from src.utils.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_get_and_expire(self):
+        with freeze_time("2020-01-01 12:00") as frozen_time:
+            cache = TTLCache(max_size=10, ttl=60)
+            cache.set("foo", False)
+            assert cache.get("foo", "missing") is False
+            frozen_time.tick(59)
+            assert "foo" in cache
+            frozen_time.tick(1)
+            assert cache.get("foo", "missing") == "missing"
+        assert len(cache) == 0
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # use a so b is least recently used
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_get_or_set(self):
+        cache = TTLCache()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return None
+
+        assert cache.get_or_set("foo", fetch) is None
+        assert cache.get_or_set("foo", fetch) is None
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+        cache.invalidate("foo")
+        cache.get_or_set("foo", fetch)
+        assert len(calls) == 2
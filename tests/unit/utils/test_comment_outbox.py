@@ -0,0 +1,46 @@
+# Standard Library
+import unittest
+
+# Third party
+from freezegun import freeze_time
+
+# YouTubeTimestampRedditBot
+from src.utils.comment_outbox import CommentOutbox
+from tests.mocks import MockSubmission
+
+
+def create_submission(title: str, score: int = 1, created_utc: float = 0):
+    return MockSubmission(
+        title, "https://youtu.be/foo", score=score, created_utc=created_utc
+    )
+
+
+class TestCommentOutbox(unittest.TestCase):
+    def test_priority(self):
+        outbox = CommentOutbox(max_size=10, max_age=60 * 60)
+        with freeze_time("1970-01-01 00:30"):
+            outbox.push(create_submission("old", created_utc=0), "old")
+            outbox.push(create_submission("new", created_utc=20 * 60), "new")
+            outbox.push(
+                create_submission("popular", score=50, created_utc=0), "popular"
+            )
+            assert [outbox.pop()[1] for _ in range(3)] == ["popular", "new", "old"]
+            assert outbox.pop() is None
+
+    def test_drop_lowest_priority_when_full(self):
+        outbox = CommentOutbox(max_size=1)
+        with freeze_time("1970-01-01 00:00"):
+            assert outbox.push(create_submission("low"), "low")
+            assert outbox.push(create_submission("high", score=10), "high")
+            assert not outbox.push(create_submission("lower", score=0), "lower")
+            assert len(outbox) == 1
+            assert outbox.dropped_full == 2
+            assert outbox.pop()[1] == "high"
+
+    def test_drop_stale(self):
+        outbox = CommentOutbox(max_age=60)
+        with freeze_time("1970-01-01 00:00") as frozen_time:
+            outbox.push(create_submission("stale"), "stale")
+            frozen_time.tick(61)
+            assert outbox.pop() is None
+        assert outbox.dropped_stale == 1
@@ -0,0 +1,78 @@
+# Standard Library
+import time
+import unittest
+
+# Third party
+from freezegun import freeze_time
+
+# YouTubeTimestampRedditBot
+from src.utils.comment_sweeper import CommentSweeper
+from tests.mocks import MockComment
+
+
+def create_sweeper() -> CommentSweeper:
+    return CommentSweeper(min_interval=10, max_interval=40, max_age=1000)
+
+
+class TestCommentSweeper(unittest.TestCase):
+    def test_back_off(self):
+        """
+        replies are checked straight away, then after 10, 20, 40, 40 seconds
+        """
+        sweeper = create_sweeper()
+        comment = MockComment("comment", score=1, created_utc=0)
+        checked_at = []
+        with freeze_time("1970-01-01 00:00") as frozen_time:
+            while time.time() <= 120:
+                if sweeper.replies_due(comment):
+                    checked_at.append(time.time())
+                    sweeper.checked_replies(comment, 0)
+                frozen_time.tick(1)
+        assert checked_at == [0, 10, 30, 70, 110]
+
+    def test_reset_on_change(self):
+        sweeper = create_sweeper()
+        comment = MockComment("comment", score=1, created_utc=0)
+        with freeze_time("1970-01-01 00:00") as frozen_time:
+            assert sweeper.replies_due(comment)
+            sweeper.checked_replies(comment, 0)
+            frozen_time.tick(10)
+            assert sweeper.replies_due(comment)
+            # new reply, check again after min_interval instead of 20 seconds
+            sweeper.checked_replies(comment, 1)
+            frozen_time.tick(10)
+            assert sweeper.replies_due(comment)
+            sweeper.checked_replies(comment, 1)
+            frozen_time.tick(10)
+            assert sweeper.replies_due(comment)
+            # nothing new, next check after 20 seconds
+            sweeper.checked_replies(comment, 1)
+            frozen_time.tick(10)
+            assert not sweeper.replies_due(comment)
+            frozen_time.tick(10)
+            assert sweeper.replies_due(comment)
+            # nothing new, next check after 40 seconds
+            sweeper.checked_replies(comment, 1)
+            frozen_time.tick(10)
+            # score changed, due again within min_interval
+            comment.score = 2
+            assert not sweeper.replies_due(comment)
+            frozen_time.tick(10)
+            assert sweeper.replies_due(comment)
+
+    def test_old_comments_not_checked(self):
+        sweeper = create_sweeper()
+        with freeze_time("1970-01-01 00:00") as frozen_time:
+            frozen_time.tick(1001)
+            assert not sweeper.replies_due(MockComment("comment", created_utc=0))
+        assert len(sweeper) == 0
+        assert sweeper.reply_checks_skipped == 1
+
+    def test_forget_missing(self):
+        sweeper = create_sweeper()
+        for comment_id in ["a", "b"]:
+            comment = MockComment("comment")
+            comment.id = comment_id
+            sweeper.replies_due(comment)
+        sweeper.forget_missing(["b"])
+        assert list(sweeper.comments) == ["b"]
@@ -0,0 +1,30 @@
+# Standard Library
+import os
+import tempfile
+import unittest
+
+# YouTubeTimestampRedditBot
+from src.utils.commented_index import CommentedIndex
+
+
+class TestCommentedIndex(unittest.TestCase):
+    def test_in_memory(self):
+        index = CommentedIndex()
+        index.add("foo")
+        index.add("foo")
+        assert "foo" in index
+        assert "bar" not in index
+        assert len(index) == 1
+
+    def test_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "commented.txt")
+            index = CommentedIndex(path)
+            index.add("foo")
+            index.add("bar")
+            index.add("foo")
+            restarted_index = CommentedIndex(path)
+            assert "foo" in restarted_index
+            assert "bar" in restarted_index
+            with open(path) as f:
+                assert f.read() == "foo\nbar\n"
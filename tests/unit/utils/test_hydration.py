@@ -0,0 +1,42 @@
+# Standard Library
+import unittest
+from unittest.mock import MagicMock
+
+# YouTubeTimestampRedditBot
+from src.utils.hydration import Hydrator
+from tests.mocks import Struct
+
+
+def info(fullnames=None, subreddits=None):
+    if fullnames is not None:
+        # pretend t3_0 has been deleted
+        return [Struct(fullname=name) for name in fullnames if name != "t3_0"]
+    return [Struct(display_name=name.upper()) for name in subreddits]
+
+
+class TestHydrator(unittest.TestCase):
+    def test_resolve(self):
+        """
+        pending fullnames and subreddit names are fetched 100 per request
+        """
+        reddit = MagicMock()
+        reddit.info.side_effect = info
+        hydrator = Hydrator(reddit)
+        for i in range(250):
+            hydrator.add(f"t3_{i}")
+        hydrator.add("t3_1")
+        for name in ["foo", "Bar", "bar"]:
+            hydrator.add_subreddit(name)
+        assert len(hydrator) == 252
+        resolved = hydrator.resolve()
+        assert hydrator.requests == 4
+        calls = reddit.info.call_args_list
+        assert [len(call.kwargs["fullnames"]) for call in calls[:3]] == [100, 100, 50]
+        assert calls[3].kwargs == {"subreddits": ["foo", "bar"]}
+        assert "t3_0" not in resolved and "t3_1" in resolved
+        assert resolved["bar"].display_name == "BAR"
+        assert len(resolved) == 249 + 2
+        # nothing left to fetch
+        assert not hydrator
+        assert hydrator.resolve() == {}
+        assert hydrator.requests == 4
@@ -1,25 +1,28 @@
 # Standard Library
+import io
+import json
+import logging
 import unittest
 from unittest.mock import patch
 
 # YouTubeTimestampRedditBot
 from src.utils.loggers import (
     comment_rich_repr,
+    create_json_queue_handler,
     generate_submission_rich_repr,
-    rich_to_str,
+    snapshot_str,
+    submission_log_payload,
 )
-from tests.mocks import MockComment, MockSubmission
+from tests.mocks import MockComment, MockSubmission, Struct
 
 
 class TestLoggers(unittest.TestCase):
-    def test_rich_to_str(self):
+    def test_snapshot_str_nested(self):
         # TODO: test monkeypatch_praw_objs directly by stubbing classes?
         MockSubmission.__rich_repr__ = generate_submission_rich_repr(
             reddit_url="reddit_test/"
         )
-        MockSubmission.__str__ = rich_to_str
         MockComment.__rich_repr__ = comment_rich_repr
-        MockComment.__str__ = rich_to_str
 
         submission = MockSubmission(title="test", url="test")
         comment = MockComment(body="test body", score=1, replies=[])
@@ -33,4 +36,89 @@ class TestLoggers(unittest.TestCase):
     * permalink:     reddit_test/test_permalink
     * title:         test
     * url:           test"""
-        assert str(comment) == expected
+        assert snapshot_str(comment) == expected
+
+    def test_json_queue_handler(self):
+        handler, listener = create_json_queue_handler()
+        stream = io.StringIO()
+        listener.handlers[0].setStream(stream)  # type: ignore
+        logger = logging.getLogger("test_json_queue_handler")
+        logger.propagate = False
+        logger.addHandler(handler)
+        listener.start()
+        try:
+            logger.warning({"id": "abc", "msg": "user is banned"})
+            logger.warning("%s comments", 3)
+        finally:
+            listener.stop()
+            logger.removeHandler(handler)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [(line["level"], line["msg"]) for line in lines] == [
+            ("WARNING", "user is banned"),
+            ("WARNING", "3 comments"),
+        ]
+        assert lines[0]["id"] == "abc"
+
+    def test_submission_log_payload(self):
+        """
+        only attributes which are already loaded are logged, nothing is lazily fetched
+        """
+
+        class LazySubmission:
+            def __init__(self):
+                self.id = "abc"
+                self.title = "test"
+
+            def __getattr__(self, name):
+                raise AssertionError(f"{name} would be fetched")
+
+        assert submission_log_payload(LazySubmission(), "msg") == {
+            "id": "abc",
+            "title": "test",
+            "msg": "msg",
+        }
+
+    def test_snapshot_str(self):
+        """
+        only loaded fields are rendered, and the snapshot is cached until praw fetches the object
+        """
+
+        class LazyComment:
+            __rich_repr__ = comment_rich_repr
+
+            def __init__(self):
+                self.id = "abc"
+                self.body = "test body"
+                self._fetched = False
+                self._replies = [Struct(body="bad bot"), Struct(id="more")]
+                self._submission = None
+                self.fetches = 0
+
+            @property
+            def replies(self):
+                return self._replies
+
+            @property
+            def submission(self):
+                return self._submission
+
+            def __getattr__(self, name):
+                if name.startswith("_") or self._fetched:
+                    raise AttributeError(name)
+                self.fetches += 1
+                self.__dict__.update(score=5, _fetched=True)
+                return getattr(self, name)
+
+        comment = LazyComment()
+        expected = """* id:            abc
+* body:          test body
+* replies:       ['bad bot']"""
+        assert snapshot_str(comment) == expected
+        comment.body = "edited"
+        assert snapshot_str(comment) == expected
+        assert comment.fetches == 0
+        # deep opts in to fetching
+        assert "* score:         5" in snapshot_str(comment, deep=True)
+        assert comment.fetches == 1
+        # fetched, so the shallow snapshot is taken again
+        assert "* body:          edited" in snapshot_str(comment)
@@ -0,0 +1,64 @@
+# Standard Library
+import unittest
+import urllib.request
+
+# Third party
+import requests
+from freezegun import freeze_time
+
+# YouTubeTimestampRedditBot
+from src.utils.metrics import Metrics, start_metrics_server
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self):
+        metrics = Metrics()
+        metrics.count("comments")
+        metrics.count("filter_rejections", stage="karma")
+        metrics.count("filter_rejections", 2, stage="karma")
+        metrics.gauge("comment_outbox_depth", 3)
+
+        with freeze_time("2020-01-01 12:00") as frozen_time:
+
+            def slow_stage():
+                frozen_time.tick(0.5)
+
+            timed_stage = metrics.timed("stage", slow_stage, stage="banned")
+            timed_stage()
+            timed_stage()
+        assert metrics.render().splitlines() == [
+            "# TYPE ytbot_comments_total counter",
+            "ytbot_comments_total 1",
+            "# TYPE ytbot_filter_rejections_total counter",
+            'ytbot_filter_rejections_total{stage="karma"} 3',
+            "# TYPE ytbot_comment_outbox_depth gauge",
+            "ytbot_comment_outbox_depth 3",
+            "# TYPE ytbot_stage_seconds summary",
+            'ytbot_stage_seconds_count{stage="banned"} 2',
+            'ytbot_stage_seconds_sum{stage="banned"} 1.0',
+        ]
+        assert "stage banned: 2 calls, mean 500.00ms" in metrics.summary()
+
+    def test_record_response(self):
+        metrics = Metrics()
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["x-ratelimit-remaining"] = "598.0"
+        response.headers["x-ratelimit-used"] = "2"
+        metrics.record_response(response)
+        assert metrics.counters["reddit_api_calls"] == {(("status", "200"),): 1}
+        assert metrics.gauges["reddit_ratelimit_remaining"] == {(): 598.0}
+        assert metrics.gauges["reddit_ratelimit_used"] == {(): 2.0}
+        assert "reddit_ratelimit_reset_seconds" not in metrics.gauges
+
+    def test_server(self):
+        metrics = Metrics()
+        metrics.count("comments")
+        server = start_metrics_server(metrics, port=0, host="127.0.0.1")
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as r:
+                assert "ytbot_comments_total 1" in r.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
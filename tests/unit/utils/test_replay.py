@@ -0,0 +1,71 @@
+# Standard Library
+import os
+import tempfile
+import unittest
+
+# YouTubeTimestampRedditBot
+from src.bot import Bot
+from src.utils.replay import (
+    Latency,
+    ReplaySubmission,
+    load_recording,
+    record_submissions,
+    replay,
+)
+from tests.mocks import MockSubmission
+
+
+class TestReplay(unittest.TestCase):
+    def test_record_and_replay(self):
+        submissions = [
+            MockSubmission("Cool thing at 12:34", "https://youtu.be/foo", "foo"),
+            MockSubmission("no timestamp", "https://youtu.be/bar", "bar"),
+            MockSubmission("at 1:00", "https://foo.com", "baz"),
+        ]
+        for (i, submission) in enumerate(submissions):
+            submission.id = str(i)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "recording.jsonl.gz")
+            # the stream is infinite, so stop at limit
+            assert record_submissions(iter(submissions * 2), path, limit=3) == 3
+            recording = list(load_recording(path, Latency()))
+        assert [s.title for s in recording] == [s.title for s in submissions]
+        assert recording[0].subreddit.display_name == "foo"
+
+        bot = Bot()
+        report = replay(bot, recording, trace_allocations=True)
+        assert report.submissions == 3
+        assert report.submissions_per_second > 0
+        assert list(report.stage_latency) == [stage for (stage, _) in bot.filter_stages]
+        assert report.allocated_blocks is not None
+        assert bot.filter_rejections == {"youtube_url": 1, "title_timestamp": 1}
+        assert bot.youtube_cache.misses == 1
+        assert "submissions/s" in str(report)
+
+    def test_replay_hydrate_batch(self):
+        """
+        subreddits of submissions which pass the local stages are hydrated per batch
+        """
+        submissions = [
+            ReplaySubmission(
+                {
+                    "id": str(i),
+                    "title": title,
+                    "url": url,
+                    "subreddit": subreddit,
+                    "created_utc": 0,
+                },
+                Latency(),
+            )
+            for (i, (title, url, subreddit)) in enumerate(
+                [
+                    ("Cool thing at 12:34", "https://youtu.be/foo", "foo"),
+                    ("no timestamp", "https://youtu.be/bar", "bar"),
+                ]
+            )
+        ]
+        bot = Bot()
+        report = replay(bot, submissions, hydrate_batch=100)
+        assert report.submissions == 2
+        assert bot.get_subreddit_info("foo") == {"banned": False}
+        assert "bar" not in bot.subreddit_cache
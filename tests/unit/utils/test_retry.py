@@ -0,0 +1,125 @@
+# Standard Library
+import unittest
+
+# Third party
+import requests
+from freezegun.api import FrozenDateTimeFactory
+from prawcore.exceptions import TooManyRequests
+
+# YouTubeTimestampRedditBot
+from src.utils.retry import RateLimitState, RetryEngine, RetryPolicy
+from tests.mocks import frozen_clock
+
+
+def create_response(status_code: int = 200, **headers: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return response
+
+
+class Flaky:
+    """raise the given errors in turn, running for run_time seconds before each"""
+
+    def __init__(self, frozen_time: FrozenDateTimeFactory, errors, run_time: float = 0):
+        self.frozen_time = frozen_time
+        self.errors = list(errors)
+        self.run_time = run_time
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.frozen_time.tick(self.run_time)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "done"
+
+
+def create_engine(**kwargs) -> RetryEngine:
+    return RetryEngine(
+        [
+            ((KeyError,), RetryPolicy(10, 60)),
+            ((LookupError,), RetryPolicy(1, 60)),
+        ],
+        **kwargs,
+    )
+
+
+class TestRetryEngine(unittest.TestCase):
+    def test_back_off(self):
+        engine = create_engine()
+        delays = []
+        with frozen_clock(jitter=1.0) as frozen_time:
+            fn = Flaky(frozen_time, [KeyError()] * 5)
+            assert engine.run(fn, lambda error, delay: delays.append(delay)) == "done"
+        assert delays == [10, 20, 40, 60, 60]
+        assert fn.calls == 6
+
+    def test_policy_per_error(self):
+        """
+        the first matching policy is used, and errors without one are raised
+        """
+        engine = create_engine()
+        delays = []
+        with frozen_clock(jitter=1.0) as frozen_time:
+            fn = Flaky(frozen_time, [IndexError(), KeyError(), ValueError()])
+            with self.assertRaises(ValueError):
+                engine.run(fn, lambda error, delay: delays.append(delay))
+        assert delays == [1, 20]
+
+    def test_jitter(self):
+        engine = create_engine()
+        delays = []
+        with frozen_clock(jitter=0.0) as frozen_time:
+            fn = Flaky(frozen_time, [KeyError()] * 2)
+            engine.run(fn, lambda e, d: delays.append(d))
+        assert delays == [5, 10]
+
+    def test_reset_after_healthy_run(self):
+        engine = create_engine(healthy_after=100)
+        delays = []
+        with frozen_clock(jitter=1.0) as frozen_time:
+            fn = Flaky(frozen_time, [KeyError()] * 3)
+            engine.run(fn, lambda error, delay: delays.append(delay))
+            assert engine.failures == 3
+            # stays up long enough before failing again, so starts from base_delay
+            fn = Flaky(frozen_time, [KeyError()], run_time=100)
+            engine.run(fn, lambda error, delay: delays.append(delay))
+        assert delays == [10, 20, 40, 10]
+        assert engine.failures == 1
+
+    def test_max_failures(self):
+        engine = create_engine(max_failures=2)
+        with frozen_clock(jitter=1.0) as frozen_time:
+            fn = Flaky(frozen_time, [KeyError()] * 3)
+            with self.assertRaises(KeyError):
+                engine.run(fn)
+        assert fn.calls == 3
+
+    def test_rate_limit(self):
+        """
+        wait for retry-after, or until the rate limit resets if it's used up
+        """
+        rate_limit = RateLimitState()
+        engine = create_engine(rate_limit=rate_limit)
+        engine.policies.insert(0, ((TooManyRequests,), RetryPolicy(1, 60)))
+        delays = []
+        too_many = TooManyRequests(create_response(429, **{"retry-after": "30"}))
+        with frozen_clock(jitter=1.0) as frozen_time:
+            engine.run(Flaky(frozen_time, [too_many]), lambda e, d: delays.append(d))
+            rate_limit.record_response(
+                create_response(
+                    **{"x-ratelimit-remaining": "0", "x-ratelimit-reset": "300"}
+                )
+            )
+            engine.run(
+                Flaky(frozen_time, [IndexError()]), lambda e, d: delays.append(d)
+            )
+            assert delays == [30, 300]
+            # plenty left, nothing to wait for
+            rate_limit.record_response(
+                create_response(
+                    **{"x-ratelimit-remaining": "10", "x-ratelimit-reset": "300"}
+                )
+            )
+            assert rate_limit.seconds_until_reset() == 0
@@ -0,0 +1,78 @@
+# Standard Library
+import os
+import tempfile
+import unittest
+
+# Third party
+from freezegun import freeze_time
+
+# YouTubeTimestampRedditBot
+from src.utils.stream_checkpoint import StreamCheckpoint
+from tests.mocks import MockSubmission
+
+
+def create_submission(submission_id: str, created_utc: float) -> MockSubmission:
+    submission = MockSubmission("title", "url", created_utc=created_utc)
+    submission.id = submission_id
+    return submission
+
+
+class TestStreamCheckpoint(unittest.TestCase):
+    def test_mark(self):
+        checkpoint = StreamCheckpoint(max_ids=2)
+        checkpoint.mark(create_submission("a", 10))
+        # processed out of order, the checkpoint stays at the newest
+        checkpoint.mark(create_submission("b", 5))
+        assert (checkpoint.fullname, checkpoint.created_utc) == ("t3_a", 10)
+        checkpoint.mark(create_submission("c", 20))
+        assert (checkpoint.fullname, checkpoint.created_utc) == ("t3_c", 20)
+        assert "a" not in checkpoint
+        assert list(checkpoint.recent_ids) == ["b", "c"]
+        assert len(checkpoint) == 2
+
+    def test_backfill(self):
+        checkpoint = StreamCheckpoint()
+        assert checkpoint.backfill(iter([create_submission("a", 1)])) == []
+        checkpoint.mark(create_submission("b", 10))
+        newest_first = iter(
+            [
+                create_submission("e", 30),
+                create_submission("d", 20),
+                create_submission("c", 10),
+                create_submission("b", 10),
+                create_submission("a", 5),
+                create_submission("z", 1),
+            ]
+        )
+        backfilled = checkpoint.backfill(newest_first)
+        assert [submission.id for submission in backfilled] == ["c", "d", "e"]
+        # stopped reading at the first submission older than the checkpoint
+        assert next(newest_first).id == "z"
+
+    def test_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, freeze_time(
+            "2020-01-01 12:00"
+        ) as frozen_time:
+            path = os.path.join(tmp_dir, "checkpoint.json")
+            checkpoint = StreamCheckpoint(path, save_interval=10)
+            checkpoint.mark(create_submission("a", 1))
+            # not saved again until save_interval has passed
+            frozen_time.tick(5)
+            checkpoint.mark(create_submission("b", 2))
+            assert StreamCheckpoint(path).fullname == "t3_a"
+            frozen_time.tick(5)
+            checkpoint.mark(create_submission("c", 3))
+            restarted = StreamCheckpoint(path)
+            assert (restarted.fullname, restarted.created_utc) == ("t3_c", 3)
+            assert "a" in restarted and "b" in restarted
+            assert not os.path.exists(f"{path}.tmp")
+
+    def test_flush(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, freeze_time("2020-01-01 12:00"):
+            path = os.path.join(tmp_dir, "checkpoint.json")
+            checkpoint = StreamCheckpoint(path, save_interval=10)
+            checkpoint.mark(create_submission("a", 1))
+            checkpoint.mark(create_submission("b", 2))
+            # saved without waiting for save_interval
+            checkpoint.flush()
+            assert StreamCheckpoint(path).fullname == "t3_b"
@@ -3,10 +3,14 @@ import unittest
 
 # YouTubeTimestampRedditBot
 from src.utils.time_parsing import (
+    AffixTrie,
     TimestampParseError,
+    TitleTimestamp,
     convert_timestamp_to_seconds,
     convert_timestamp_to_yt,
     get_title_time,
+    parse_titles,
+    timestamp_scanner,
 )
 
 
@@ -163,3 +167,67 @@ class TestTimeParsing(unittest.TestCase):
         for (i, d) in enumerate(dicts):
             with self.subTest(i=i):
                 assert get_title_time(d["input"]) == d["expected_output"]
+
+    def test_timestamp_scanner(self):
+        dicts = [
+            {
+                "input": "Starts at 01:22:35",
+                "expected_output": TitleTimestamp(
+                    "01:22:35", (10, 18), 1, 22, 35, 4955
+                ),
+            },
+            {
+                "input": "23:34 cool thing",
+                "expected_output": TitleTimestamp("23:34", (0, 5), None, 23, 34, 1414),
+            },
+            {
+                "input": "At 2:30 and 3:45 everything explodes",
+                "expected_output": TitleTimestamp("2:30", (3, 7), None, 2, 30, 150),
+            },
+            # first candidate is not standalone, so later timestamps are ignored
+            {"input": "[23:34] then 1:00", "expected_output": None},
+            {"input": "This has no numbers in it", "expected_output": None},
+        ]
+
+        for (i, d) in enumerate(dicts):
+            with self.subTest(i=i):
+                assert timestamp_scanner.scan(d["input"]) == d["expected_output"]
+
+    def test_affix_trie(self):
+        suffixes = AffixTrie(["est", "est", "in the morning"])
+        prefixes = AffixTrie(["under", "broke the"], reverse=True)
+        # duplicates collapse
+        assert len(suffixes) == 2
+        dicts = [
+            {"trie": suffixes, "input": ("3:00 EST", 4), "expected_output": True},
+            {"trie": suffixes, "input": ("3:00  Estonia", 4), "expected_output": True},
+            {"trie": suffixes, "input": ("3:00 in the", 4), "expected_output": False},
+            {"trie": suffixes, "input": ("3:00", 4), "expected_output": False},
+            {"trie": prefixes, "input": ("in UNDER 3:00", 9), "expected_output": True},
+            {
+                "trie": prefixes,
+                "input": ("broke the 3:00", 10),
+                "expected_output": True,
+            },
+            {"trie": prefixes, "input": ("the 3:00", 4), "expected_output": False},
+            {"trie": prefixes, "input": ("3:00", 0), "expected_output": False},
+        ]
+
+        for (i, d) in enumerate(dicts):
+            with self.subTest(i=i):
+                assert d["trie"].matches(*d["input"]) == d["expected_output"]
+
+    def test_parse_titles(self):
+        titles = [
+            "no timestamp here",
+            "Cool thing at 12:34",
+            "multi\nline 1:00",
+            "thing at 3:00 EST",
+            "Starts at 01:22:35",
+        ]
+        expected = [(title, get_title_time(title)) for title in titles]
+        # chunk boundaries should not affect results
+        for chunk_size in [1, 2, 1000]:
+            with self.subTest(chunk_size=chunk_size):
+                actual = list(parse_titles(iter(titles), chunk_size=chunk_size))
+                assert actual == expected
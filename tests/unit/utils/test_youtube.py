@@ -1,8 +1,69 @@
 # Standard Library
+import os
+import tempfile
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+# Third party
+from pytube import request as pytube_request
 
 # YouTubeTimestampRedditBot
-from src.utils.youtube import is_youtube_url_without_timestamp
+from src.utils.youtube import (
+    YouTubeDeadlineExceeded,
+    YouTubeMetadata,
+    YouTubeMetadataCache,
+    YouTubeSession,
+    add_timestamp_to_youtube_url,
+    fetch_youtube_metadata,
+    get_video_id,
+    is_youtube_url_without_timestamp,
+    parse_youtube_url,
+    scan_video_details,
+    use_youtube_session,
+)
+
+# videoDetails near the start of a much larger page, like youtube's watch pages
+watch_page = (
+    '"videoDetails":{"title":"a video","lengthSeconds":"61"}' + " " * 256 * 1024
+).encode()
+
+
+class YouTubeHandler(BaseHTTPRequestHandler):
+    # keep-alive
+    protocol_version = "HTTP/1.1"
+    # client address of every request
+    clients: list = []
+
+    def send_body(self, body: bytes, delay: float = 0):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        for i in range(len(body)):
+            time.sleep(delay)
+            self.wfile.write(body[i : i + 1])
+            self.wfile.flush()
+
+    def do_GET(self):
+        self.clients.append(self.client_address)
+        if self.path == "/slow":
+            self.send_body(b"0123456789", delay=0.05)
+        elif self.path == "/video":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(watch_page)))
+            self.end_headers()
+            self.wfile.write(watch_page)
+        else:
+            self.send_body(b"watch page")
+
+    def do_POST(self):
+        self.clients.append(self.client_address)
+        self.send_body(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def log_message(self, format, *args):
+        pass
 
 
 class Youtube(unittest.TestCase):
@@ -16,9 +77,17 @@ class Youtube(unittest.TestCase):
             {"input": "https://youtube.com/asdf?t=1m", "expected_output": False},
             {"input": "wwww.youtube.com?watch=asdf&t=1m", "expected_output": False},
             {"input": "wwww.youtu.be/asdf?t=12s", "expected_output": False},
+            {"input": "https://youtu.be/asdf#t=12s", "expected_output": False},
+            {
+                "input": "https://youtube.com/embed/asdf?start=12",
+                "expected_output": False,
+            },
+            {"input": "https://youtu.be/asdf?si=foo", "expected_output": True},
             # not youtube
             {"input": "wwww.asdf.com", "expected_output": False},
             {"input": "https://youfoo.com", "expected_output": False},
+            {"input": "https://foo.com/?ref=youtube.com", "expected_output": False},
+            {"input": "https://youtube.community.com", "expected_output": False},
         ]
 
         for (i, d) in enumerate(dicts):
@@ -26,3 +95,168 @@ class Youtube(unittest.TestCase):
                 assert (
                     is_youtube_url_without_timestamp(d["input"]) == d["expected_output"]
                 )
+
+    def test_parse_youtube_url(self):
+        parsed = parse_youtube_url(
+            "https://m.youtube.com/watch?v=bG4gZ8hXS0M&feature=share#t=1m"
+        )
+        assert parsed.host_kind == "youtube.com"
+        assert parsed.path_kind == "watch"
+        assert parsed.video_id == "bG4gZ8hXS0M"
+        assert parsed.timestamp == "1m"
+        assert parsed.base == "https://m.youtube.com/watch"
+        assert parsed.query == "v=bG4gZ8hXS0M&feature=share"
+        assert parsed.fragment == "t=1m"
+        assert parse_youtube_url("https://foo.com") is None
+
+    def test_add_timestamp_to_youtube_url(self):
+        dicts = [
+            {
+                "input": "https://www.youtube.com/watch?v=bG4gZ8hXS0M",
+                "expected_output": "https://www.youtube.com/watch?v=bG4gZ8hXS0M&t=1m2s",
+            },
+            {
+                "input": "https://youtu.be/bG4gZ8hXS0M?si=foo",
+                "expected_output": "https://youtu.be/bG4gZ8hXS0M?si=foo&t=1m2s",
+            },
+            {
+                "input": "https://youtu.be/bG4gZ8hXS0M#foo",
+                "expected_output": "https://youtu.be/bG4gZ8hXS0M?t=1m2s#foo",
+            },
+            {
+                "input": "https://youtube.com/shorts/bG4gZ8hXS0M?feature=share",
+                "expected_output": "https://www.youtube.com/watch?v=bG4gZ8hXS0M&t=1m2s",
+            },
+        ]
+
+        for (i, d) in enumerate(dicts):
+            with self.subTest(i=i):
+                actual = add_timestamp_to_youtube_url(d["input"], "1m2s")
+                assert actual == d["expected_output"]
+
+    def test_get_video_id(self):
+        dicts = [
+            {"input": "https://youtu.be/bG4gZ8hXS0M", "expected_output": "bG4gZ8hXS0M"},
+            {
+                "input": "https://m.youtube.com/watch?v=bG4gZ8hXS0M&feature=share",
+                "expected_output": "bG4gZ8hXS0M",
+            },
+            {
+                "input": "https://www.youtube.com/watch?feature=share&v=bG4gZ8hXS0M",
+                "expected_output": "bG4gZ8hXS0M",
+            },
+            {
+                "input": "https://youtube.com/shorts/bG4gZ8hXS0M?si=foo",
+                "expected_output": "bG4gZ8hXS0M",
+            },
+            {"input": "https://youtube.com/asdf", "expected_output": None},
+        ]
+
+        for (i, d) in enumerate(dicts):
+            with self.subTest(i=i):
+                assert get_video_id(d["input"]) == d["expected_output"]
+
+    def test_youtube_metadata_cache(self):
+        fetched = []
+
+        def fetch(url):
+            fetched.append(url)
+            return YouTubeMetadata(length=100, title="foo")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "cache.db")
+            cache = YouTubeMetadataCache(db_path=db_path, fetch=fetch)
+            for url in [
+                "https://youtu.be/bG4gZ8hXS0M",
+                "https://m.youtube.com/watch?v=bG4gZ8hXS0M&feature=share",
+            ]:
+                assert cache.get(url) == YouTubeMetadata(length=100, title="foo")
+            assert (cache.hits, cache.disk_hits, cache.misses) == (1, 0, 1)
+
+            # new cache simulates a restart, should read from sqlite
+            restarted_cache = YouTubeMetadataCache(db_path=db_path, fetch=fetch)
+            assert restarted_cache.get("https://youtu.be/bG4gZ8hXS0M").title == "foo"
+            assert restarted_cache.disk_hits == 1
+            assert len(fetched) == 1
+
+    def test_youtube_session(self):
+        """
+        requests reuse a pooled connection, pytube goes through the session,
+        and slow responses are cut off at the deadline
+        """
+        YouTubeHandler.clients = []
+        server = ThreadingHTTPServer(("127.0.0.1", 0), YouTubeHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+        session = YouTubeSession(deadline=0.2)
+        execute_request = pytube_request._execute_request
+        try:
+            use_youtube_session(session)
+            assert pytube_request.get(f"{url}/watch") == "watch page"
+            assert pytube_request.post(f"{url}/player", data={"a": 1}) == '{"a": 1}'
+            assert session.request("GET", f"{url}/watch").read() == b"watch page"
+            assert len(set(YouTubeHandler.clients)) == 1
+            with self.assertRaises(YouTubeDeadlineExceeded):
+                session.request("GET", f"{url}/slow")
+        finally:
+            pytube_request._execute_request = execute_request
+            server.shutdown()
+            server.server_close()
+
+    def test_scan_text_keeps_connection(self):
+        """
+        scanning stops early, but the rest of the page is still read so the connection is reused
+        """
+        YouTubeHandler.clients = []
+        server = ThreadingHTTPServer(("127.0.0.1", 0), YouTubeHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/video"
+        session = YouTubeSession()
+        try:
+            for _ in range(3):
+                metadata = session.scan_text(url, scan_video_details)
+                assert metadata == YouTubeMetadata(length=61, title="a video")
+            assert len(YouTubeHandler.clients) == 3
+            assert len(set(YouTubeHandler.clients)) == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_scan_video_details(self):
+        """
+        length and title are found across chunk boundaries, and reading stops once they are
+        """
+        page = (
+            '<script>var ytInitialPlayerResponse = {"playabilityStatus":{},'
+            '"videoDetails":{"videoId":"bG4gZ8hXS0M","title":"Mikhail \\"A\\" Rank 21:03 \\u0026 more",'
+            '"lengthSeconds":"1477","keywords":["a"]},"title":"not this one"'
+        )
+        read = []
+
+        def chunks():
+            for i in range(0, len(page), 7):
+                read.append(i)
+                yield page[i : i + 7]
+            # never reached
+            raise AssertionError("read past videoDetails")
+
+        metadata = scan_video_details(chunks())
+        assert metadata == YouTubeMetadata(
+            length=1477, title='Mikhail "A" Rank 21:03 & more'
+        )
+        assert len(read) < len(page) / 7
+        assert scan_video_details(iter(["<html>consent page</html>"])) is None
+
+    def test_fetch_youtube_metadata_falls_back_to_pytube(self):
+        session = MagicMock()
+        session.scan_text.side_effect = lambda url, scan: scan(iter(["no details"]))
+        with patch(
+            "src.utils.youtube.fetch_with_pytube",
+            return_value=YouTubeMetadata(length=60, title="pytube"),
+        ) as fetch_with_pytube:
+            metadata = fetch_youtube_metadata("https://youtu.be/bG4gZ8hXS0M", session)
+        assert metadata == YouTubeMetadata(length=60, title="pytube")
+        session.scan_text.assert_called_once_with(
+            "https://www.youtube.com/watch?v=bG4gZ8hXS0M", scan_video_details
+        )
+        fetch_with_pytube.assert_called_once()